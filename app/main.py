@@ -3,17 +3,28 @@ import streamlit as st
 from pathlib import Path
 import pandas as pd
 import io
+import os
 import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
-from src.parser import parse_files_to_dataframe
-from src.metrics import (
-    compute_all_metrics,
-    make_cpf_cnpj_lists,
-    protocols_multi_by_type,
+from src.cache import ParseCache, content_hash
+from src.cube import MetricsCube
+from src.dataset import IncrementalDataset
+from src.export import (
+    CSV_MIME,
+    GZIP_MIME,
+    ExportCache,
+    csv_bytes,
+    download_button,
 )
+from src.history import DebtorIndex, batch_key
+from src.instrument import Recorder, configure_logging, stage, write_prometheus
+from src.jobs import DONE, FAILED, ParseJob
+from src.metrics import protocols_multi_by_type
+from src.paging import TablePager, page_count
+from src.search import SearchIndex
 from src.viz import plot_pie_cpf_cnpj, plot_bar_multi_protocols
 
 # Page config
@@ -46,10 +57,255 @@ with col2:
 
 st.markdown("---")
 
+# eventos de desempenho em JSON (XML_UTILS_PERF_LOG), se configurado
+configure_logging()
+
+# Cache de parse em disco (reaproveitado entre uploads do mesmo arquivo)
+parse_cache = ParseCache(
+    os.environ.get("XML_UTILS_CACHE_DIR", str(ROOT / ".cache" / "parse")),
+    max_bytes=int(os.environ.get("XML_UTILS_CACHE_MAX_MB", "512")) * 1024 * 1024,
+)
+
+
+# índice de devedores de lotes anteriores (reincidência), se configurado
+HISTORY_PATH = os.environ.get("XML_UTILS_HISTORY")
+
+PAGE_SIZES = (50, 100, 250, 500, 1000)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_history(path, mtime):
+    """DebtorIndex do arquivo, recarregado quando o arquivo muda (mtime)."""
+    return DebtorIndex.load(path)
+
+
+def history_section(pipeline, fingerprint):
+    """
+    Devedores do upload já vistos em lotes anteriores e o botão que registra
+    o upload como um lote no histórico (uma vez por conteúdo).
+    """
+    mtime = os.path.getmtime(HISTORY_PATH) if os.path.exists(HISTORY_PATH) else None
+    index = load_history(HISTORY_PATH, mtime)
+    key = batch_key(fp[2] for fp in fingerprint)
+    registered = index.has_batch(key)
+    df = pipeline["df"]
+    if pipeline.get("history_state") != (mtime, key):
+        with stage("historico", rows=len(df)):
+            pipeline["history"] = index.lookup(
+                df["devedor_documento"].to_numpy(dtype=object),
+                before=key if registered else None,
+            )
+        pipeline["history_state"] = (mtime, key)
+    repeat = pipeline["history"]
+    with st.expander(f"Devedores já vistos em lotes anteriores ({len(repeat)})"):
+        st.dataframe(repeat, hide_index=True)
+        st.caption(f"{len(index)} documentos em {len(index.batch_keys)} lotes.")
+
+    st.sidebar.subheader("Histórico de devedores")
+    if registered:
+        st.sidebar.caption("Este upload já está registrado no histórico.")
+        return
+    label = st.sidebar.text_input(
+        "Rótulo do lote", value=pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
+    )
+    if st.sidebar.button("Registrar lote no histórico"):
+        index.add_batch(
+            label,
+            df["devedor_documento"].to_numpy(dtype=object),
+            df["protocolo"].to_numpy(dtype=object),
+            key=key,
+        )
+        index.save(HISTORY_PATH)
+        st.rerun()
+
+
+def upload_fingerprint(files):
+    """
+    Identifica o conjunto de uploads: (nome, tamanho, sha256) de cada arquivo.
+    O hash de cada upload é calculado uma vez por sessão (os reruns que
+    acompanham o parse não releem os arquivos).
+    """
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    fingerprint = []
+    for f in files:
+        key = (f.name, f.size, getattr(f, "file_id", None))
+        if key not in hashes:
+            hashes[key] = content_hash(f)
+        fingerprint.append((f.name, f.size, hashes[key]))
+    return tuple(fingerprint)
+
+
+def session_dataset():
+    """IncrementalDataset da sessão (criado no primeiro upload)."""
+    if "dataset" not in st.session_state:
+        st.session_state["dataset"] = IncrementalDataset(
+            streaming=True, workers=os.cpu_count(), cache=parse_cache
+        )
+        st.session_state["dataset_fps"] = {}
+    return st.session_state["dataset"]
+
+
+def sync_dataset(files, fingerprint):
+    """
+    Mantém o IncrementalDataset da sessão igual ao upload atual: os arquivos
+    removidos são descartados e os novos ou alterados são parseados por um
+    ParseJob em segundo plano. Retorna o job em andamento (ou None).
+
+    Enquanto um job roda, os reruns não começam outro nem o cancelam: as
+    diferenças que sobrarem são tratadas no primeiro rerun depois do fim.
+    """
+    dataset = session_dataset()
+    job = st.session_state.get("parse_job")
+    if job is not None:
+        if job.running:
+            return job
+        del st.session_state["parse_job"]
+        if job.exception is not None:
+            st.error(f"O parse em segundo plano falhou: {job.exception}")
+    known = st.session_state["dataset_fps"]
+    current = {fp[0]: fp for fp in fingerprint}
+    for name in list(known):
+        if name not in current:
+            dataset.remove_file(name)
+            del known[name]
+    changed = [f for f in files if known.get(f.name) != current[f.name]]
+    if not changed:
+        return None
+    # um .zip alterado pode ter perdido membros: sai tudo dele antes
+    for f in changed:
+        dataset.remove_file(f.name)
+    known.update({f.name: current[f.name] for f in changed})
+    # as etapas do parse entram no painel de desempenho da carga
+    job = ParseJob(dataset, changed, recorder=Recorder()).start()
+    st.session_state["parse_job"] = job
+    st.session_state["parse_perf"] = job.recorder
+    return job
+
+
+def run_pipeline(fingerprint, dataset):
+    """
+    Métricas + listas + gráficos do dataset da sessão, memoizados em
+    st.session_state pelo fingerprint do upload e pela versão do dataset:
+    reruns que só mudam filtros reaproveitam o resultado inteiro. Só o da
+    versão atual fica guardado (ele segura o df inteiro).
+    """
+    key = (fingerprint, dataset.version)
+    cached = st.session_state.get("pipeline")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    # libera o resultado da versão anterior antes de montar o novo
+    st.session_state.pop("pipeline", None)
+    result = build_pipeline(dataset)
+    st.session_state["pipeline"] = (key, result)
+    return result
+
+
+def build_pipeline(dataset):
+    df = dataset.df
+    result = {
+        "df": df,
+        "parse_errors": dataset.errors,
+        "manifest": dataset.manifest,
+        "cache_stats": dataset.cache.stats(),
+    }
+    if df.empty:
+        return result
+    metrics = dataset.metrics()
+    result["metrics"] = metrics
+    result["cpfs"], result["cnpjs"] = dataset.cpf_cnpj_lists()
+    result["fig_pie"] = plot_pie_cpf_cnpj(
+        metrics["qtd_cpfs_unicos"], metrics["qtd_cnpjs_unicos"]
+    )
+    result["fig_bar"] = plot_bar_multi_protocols(
+        metrics["cpf_multi_count"], metrics["cnpj_multi_count"]
+    )
+    result["file_opts"] = sorted(df["source_file"].unique().tolist())
+    result["tipo_opts"] = sorted(df["devedor_tipo"].fillna("UNKNOWN").unique().tolist())
+    with stage("search_index", rows=len(df)):
+        result["search_index"] = SearchIndex(df)
+    result["pager"] = TablePager(df)
+    result["cube"] = MetricsCube(df)
+    return result
+
+
+def brl(cents):
+    """Centavos como texto em reais: 123456 -> "R$ 1.234,56"."""
+    text = f"{cents / 100:,.2f}".replace(",", "_").replace(".", ",")
+    return "R$ " + text.replace("_", ".")
+
+
+def metric_cards(metrics):
+    """Os cards de indicadores (dict de compute_all_metrics)."""
+    cards = (
+        ("Total Títulos", metrics["total_titulos"]),
+        ("Títulos com Telefone", metrics["titles_with_phone"]),
+        ("Títulos com Celular Válido", metrics["titles_with_valid_mobile"]),
+        ("Telefones Únicos", metrics["unique_phones"]),
+        ("Títulos com CPF", metrics["titles_with_cpf"]),
+        ("Títulos com CNPJ", metrics["titles_with_cnpj"]),
+        ("CPFs Únicos", metrics["qtd_cpfs_unicos"]),
+        ("CNPJs Únicos", metrics["qtd_cnpjs_unicos"]),
+        ("CPFs multi protocolo", metrics["cpf_multi_count"]),
+        ("CNPJs multi protocolo", metrics["cnpj_multi_count"]),
+        ("Valor Protestado Total", brl(metrics["valor_total_centavos"])),
+        ("Valor Médio por Título", brl(metrics["valor_medio_centavos"])),
+        ("Valor (títulos com CPF)", brl(metrics["valor_cpf_centavos"])),
+        ("Valor (títulos com CNPJ)", brl(metrics["valor_cnpj_centavos"])),
+    )
+    columns = [c for _ in range(0, len(cards), 4) for c in st.columns(4)]
+    for col, (title, value) in zip(columns, cards):
+        col.markdown(
+            f"<div class='card'><div class='card-title'>{title}</div><div class='card-value'>{value}</div></div>",
+            unsafe_allow_html=True,
+        )
+
+
+def parse_progress(job, dataset):
+    """
+    Acompanha o ParseJob: progresso por arquivo, registros extraídos e os
+    indicadores parciais dos arquivos já prontos. Termina a execução com um
+    rerun agendado, que mostra o estado seguinte.
+    """
+    status = job.status()
+    total = len(status)
+    done = sum(s in (DONE, FAILED) for s in status.values())
+    st.progress(
+        done / total if total else 0.0,
+        text=f"Parseando arquivos: {done}/{total} prontos, "
+        f"{job.records} registros extraídos",
+    )
+    if job.errors:
+        st.warning(f"{len(job.errors)} arquivo(s) com erro no parse até agora.")
+    partial = dataset.metrics()
+    if not partial["total_titulos"]:
+        st.info("Aguardando os primeiros registros...")
+    else:
+        st.markdown("### Indicadores parciais")
+        metric_cards(partial)
+    with st.expander("Arquivos", expanded=True):
+        st.dataframe(
+            pd.DataFrame({"arquivo": list(status), "status": list(status.values())}),
+            hide_index=True,
+        )
+    job.wait(1.0)
+    st.rerun()
+
+
+def search_index(pipeline, ignore_accents):
+    """Índice de busca do dataset; o sem acentos só é montado se pedido."""
+    if not ignore_accents:
+        return pipeline["search_index"]
+    if "search_index_folded" not in pipeline:
+        pipeline["search_index_folded"] = SearchIndex(
+            pipeline["df"], accent_insensitive=True
+        )
+    return pipeline["search_index_folded"]
+
+
 # Upload area
 uploaded_files = st.file_uploader(
-    "Upload de XMLs (arraste múltiplos arquivos)",
-    type=["xml"],
+    "Upload de XMLs (arraste múltiplos arquivos; aceita .zip e .xml.gz)",
+    type=["xml", "zip", "gz"],
     accept_multiple_files=True,
 )
 
@@ -58,59 +314,72 @@ st.sidebar.header("Ações Rápidas")
 st.sidebar.write("Faça upload dos XMLs e aguarde a análise automática.")
 
 if uploaded_files:
-    # parse
-    with st.spinner("Parseando arquivos..."):
-        df, parse_errors = parse_files_to_dataframe(uploaded_files)
+    # parse incremental + métricas (memoizado pelo conteúdo do upload);
+    # as etapas da última carga que fez algum trabalho ficam na sessão
+    load_perf = Recorder()
+    render_perf = Recorder()
+    fingerprint = upload_fingerprint(uploaded_files)
+    job = sync_dataset(uploaded_files, fingerprint)
+    dataset = session_dataset()
+    if job is not None:
+        parse_progress(job, dataset)
+    with load_perf.activate():
+        pipeline = run_pipeline(fingerprint, dataset)
+    parse_perf = st.session_state.pop("parse_perf", None)
+    if parse_perf is not None:
+        load_perf = Recorder(parse_perf.events + load_perf.events)
+    if load_perf.events:
+        st.session_state["load_perf"] = load_perf
+    load_perf = st.session_state.get("load_perf", load_perf)
+    df = pipeline["df"]
+    parse_errors = pipeline["parse_errors"]
+    cache_stats = pipeline["cache_stats"]
+    st.sidebar.caption(
+        f"Cache de parse: {cache_stats['hits']} acertos, {cache_stats['misses']} faltas"
+    )
 
     if parse_errors:
         st.warning("Alguns arquivos apresentaram erros no parse. Veja abaixo:")
         for e in parse_errors:
             st.write("- " + e)
 
+    # conferência TotalTitulos declarado x extraído, por arquivo
+    manifest = pipeline["manifest"]
+    n_div = int(manifest["divergente"].fillna(False).sum())
+    if n_div:
+        st.warning(
+            f"{n_div} arquivo(s) com TotalTitulos diferente do número de títulos extraídos."
+        )
+    with st.expander("Conferência por arquivo (TotalTitulos)", expanded=bool(n_div)):
+        st.dataframe(manifest, hide_index=True)
+
     if df.empty:
         st.info("Nenhum registro extraído — verifique a estrutura dos XMLs.")
     else:
-        # compute metrics
-        metrics = compute_all_metrics(df)
-
-        # top cards
-        st.markdown("### Indicadores rápidos")
-        c1, c2, c3, c4 = st.columns(4)
-        c5, c6, c7, c8 = st.columns(4)
+        metrics = pipeline["metrics"]
+        # exportações geradas só no clique, guardadas por estado de filtro
+        exports = st.session_state.setdefault("exports", ExportCache())
 
-        c1.markdown(
-            f"<div class='card'><div class='card-title'>Total Títulos</div><div class='card-value'>{metrics['total_titulos']}</div></div>",
-            unsafe_allow_html=True,
+        # downloads rápidos: listas de documentos únicos
+        st.sidebar.download_button(
+            "Baixar lista de CPFs únicos",
+            data="\n".join(pipeline["cpfs"]).encode("utf-8"),
+            file_name="cpfs_unicos.txt",
+            mime="text/plain",
         )
-        c2.markdown(
-            f"<div class='card'><div class='card-title'>Títulos com Telefone</div><div class='card-value'>{metrics['titles_with_phone']}</div></div>",
-            unsafe_allow_html=True,
-        )
-        c3.markdown(
-            f"<div class='card'><div class='card-title'>Títulos com CPF</div><div class='card-value'>{metrics['titles_with_cpf']}</div></div>",
-            unsafe_allow_html=True,
-        )
-        c4.markdown(
-            f"<div class='card'><div class='card-title'>Títulos com CNPJ</div><div class='card-value'>{metrics['titles_with_cnpj']}</div></div>",
-            unsafe_allow_html=True,
+        st.sidebar.download_button(
+            "Baixar lista de CNPJs únicos",
+            data="\n".join(pipeline["cnpjs"]).encode("utf-8"),
+            file_name="cnpjs_unicos.txt",
+            mime="text/plain",
         )
 
-        c5.markdown(
-            f"<div class='card'><div class='card-title'>CPFs Únicos</div><div class='card-value'>{metrics['qtd_cpfs_unicos']}</div></div>",
-            unsafe_allow_html=True,
-        )
-        c6.markdown(
-            f"<div class='card'><div class='card-title'>CNPJs Únicos</div><div class='card-value'>{metrics['qtd_cnpjs_unicos']}</div></div>",
-            unsafe_allow_html=True,
-        )
-        c7.markdown(
-            f"<div class='card'><div class='card-title'>CPFs multi protocolo</div><div class='card-value'>{metrics['cpf_multi_count']}</div></div>",
-            unsafe_allow_html=True,
-        )
-        c8.markdown(
-            f"<div class='card'><div class='card-title'>CNPJs multi protocolo</div><div class='card-value'>{metrics['cnpj_multi_count']}</div></div>",
-            unsafe_allow_html=True,
-        )
+        # top cards: preenchidos depois dos filtros da aba "Analítico Geral"
+        st.markdown("### Indicadores rápidos")
+        cards_slot = st.container()
+
+        if HISTORY_PATH:
+            history_section(pipeline, fingerprint)
 
         st.markdown("---")
 
@@ -122,69 +391,138 @@ if uploaded_files:
         with tab1:
             st.subheader("Tabela Analítica (cada linha = 1 devedor extraído)")
             # filters
-            files = sorted(df["source_file"].unique().tolist())
+            files = pipeline["file_opts"]
             selected_files = st.multiselect("Arquivos", files, default=files)
-            tipo_opts = sorted(df["devedor_tipo"].fillna("UNKNOWN").unique().tolist())
+            tipo_opts = pipeline["tipo_opts"]
             selected_tipos = st.multiselect(
                 "Tipo de Devedor", tipo_opts, default=tipo_opts
             )
             text_search = st.text_input("Buscar por nome ou documento")
+            ignore_accents = st.checkbox("Ignorar acentos na busca", value=False)
 
-            mask = df["source_file"].isin(selected_files)
-            if selected_tipos:
-                mask &= df["devedor_tipo"].fillna("UNKNOWN").isin(selected_tipos)
-            if text_search:
-                ts = text_search.lower()
-                mask &= df.apply(
-                    lambda r: ts in str(r.get("devedor_nome") or "").lower()
-                    or ts in str(r.get("devedor_documento_raw") or "").lower()
-                    or ts in str(r.get("devedor_documento") or ""),
-                    axis=1,
+            # indicadores e gráficos seguem os filtros de arquivo e tipo,
+            # fundidos a partir do cubo (src.cube)
+            cube_state = (fingerprint, tuple(selected_files), tuple(selected_tipos))
+            filtered = set(selected_files) != set(files) or (
+                bool(selected_tipos) and set(selected_tipos) != set(tipo_opts)
+            )
+            if filtered:
+                metrics = pipeline["cube"].metrics(
+                    selected_files, selected_tipos or None
                 )
+            with cards_slot:
+                metric_cards(metrics)
+                if filtered:
+                    st.caption(
+                        "Indicadores dos arquivos e tipos de devedor selecionados "
+                        "em Analítico Geral (a busca por texto não entra)."
+                    )
 
-            df_filtered = df[mask].copy()
-            st.dataframe(df_filtered.reset_index(drop=True), height=480)
+            filter_state = (
+                fingerprint,
+                tuple(selected_files),
+                tuple(selected_tipos),
+                text_search,
+                ignore_accents,
+            )
+
+            def filter_mask():
+                mask = df["source_file"].isin(selected_files)
+                if selected_tipos:
+                    mask &= df["devedor_tipo"].fillna("UNKNOWN").isin(selected_tipos)
+                if text_search:
+                    mask &= search_index(pipeline, ignore_accents).mask(text_search)
+                return mask.to_numpy()
+
+            # tabela paginada no servidor: só a página visível, com as
+            # colunas escolhidas, vai para o navegador
+            all_columns = list(df.columns)
+            p1, p2, p3 = st.columns([0.5, 0.3, 0.2])
+            shown_columns = p1.multiselect("Colunas", all_columns, default=all_columns)
+            sort_by = p2.selectbox("Ordenar por", ["(ordem original)"] + all_columns)
+            descending = p3.checkbox("Decrescente", value=False)
+            sort_by = None if sort_by == "(ordem original)" else sort_by
+            pager = pipeline["pager"]
+            with render_perf.stage("filtros", rows=len(df)):
+                rows = pager.rows(filter_state, filter_mask, sort_by, not descending)
+            p4, p5 = st.columns([0.2, 0.8])
+            page_size = p4.selectbox("Linhas por página", PAGE_SIZES, index=1)
+            pages = page_count(len(rows), page_size)
+            # um filtro novo pode ter menos páginas que a atual
+            if st.session_state.get("table_page", 1) > pages:
+                st.session_state["table_page"] = pages
+            page = p5.number_input(
+                "Página", min_value=1, max_value=pages, key="table_page"
+            )
+            page_df = pager.page(rows, page, page_size, shown_columns or all_columns)
+            with render_perf.stage("st.dataframe", rows=len(page_df)):
+                st.dataframe(page_df, height=480)
+            first = (page - 1) * page_size
+            st.caption(
+                f"Linhas {first + 1 if len(page_df) else 0}–{first + len(page_df)} "
+                f"de {len(rows)} (página {page} de {pages})"
+            )
 
             # downloads
-            st.download_button(
+            compress = st.checkbox("Compactar CSV (gzip)", value=False)
+            download_button(
+                st,
                 "Baixar CSV (filtrado)",
-                data=df_filtered.to_csv(index=False).encode("utf-8"),
-                file_name="analitico_filtrado.csv",
-                mime="text/csv",
+                exports.deferred(
+                    ("analitico", filter_state, compress),
+                    lambda: csv_bytes(
+                        df.iloc[pager.rows(filter_state, filter_mask)],
+                        compress=compress,
+                    ),
+                ),
+                file_name="analitico_filtrado.csv" + (".gz" if compress else ""),
+                mime=GZIP_MIME if compress else CSV_MIME,
             )
 
             # charts
             st.subheader("Gráficos")
             col_a, col_b = st.columns(2)
-            with col_a:
-                fig1 = plot_pie_cpf_cnpj(
+            if filtered:
+                fig_pie = plot_pie_cpf_cnpj(
                     metrics["qtd_cpfs_unicos"], metrics["qtd_cnpjs_unicos"]
                 )
-                st.plotly_chart(fig1, use_container_width=True)
-            with col_b:
-                fig2 = plot_bar_multi_protocols(
+                fig_bar = plot_bar_multi_protocols(
                     metrics["cpf_multi_count"], metrics["cnpj_multi_count"]
                 )
-                st.plotly_chart(fig2, use_container_width=True)
+            else:
+                fig_pie, fig_bar = pipeline["fig_pie"], pipeline["fig_bar"]
+            with render_perf.stage("st.plotly_chart"):
+                with col_a:
+                    st.plotly_chart(fig_pie, use_container_width=True)
+                with col_b:
+                    st.plotly_chart(fig_bar, use_container_width=True)
 
         with tab2:
             st.subheader("CPFs com mais de 1 protocolo único")
             st.dataframe(metrics["df_cpf_multi"], height=480)
-            st.download_button(
+            download_button(
+                st,
                 "Baixar: CPFs com >1 protocolo (CSV)",
-                data=metrics["df_cpf_multi"].to_csv(index=False).encode("utf-8"),
+                exports.deferred(
+                    ("cpf_multi", cube_state),
+                    lambda: csv_bytes(metrics["df_cpf_multi"]),
+                ),
                 file_name="cpfs_multi_protocolos.csv",
-                mime="text/csv",
+                mime=CSV_MIME,
             )
 
         with tab3:
             st.subheader("CNPJs com mais de 1 protocolo único")
             st.dataframe(metrics["df_cnpj_multi"], height=480)
-            st.download_button(
+            download_button(
+                st,
                 "Baixar: CNPJs com >1 protocolo (CSV)",
-                data=metrics["df_cnpj_multi"].to_csv(index=False).encode("utf-8"),
+                exports.deferred(
+                    ("cnpj_multi", cube_state),
+                    lambda: csv_bytes(metrics["df_cnpj_multi"]),
+                ),
                 file_name="cnpjs_multi_protocolos.csv",
-                mime="text/csv",
+                mime=CSV_MIME,
             )
 
         st.markdown("---")
@@ -192,5 +530,22 @@ if uploaded_files:
             "Exportações disponíveis no final de cada aba — baixe CSV/Excel conforme necessário."
         )
 
+    # painel de desempenho: última carga (parse, DataFrame, métricas,
+    # gráficos) e esta execução (filtros e renderização)
+    with st.sidebar.expander("Desempenho"):
+        st.caption("Última carga")
+        st.dataframe(load_perf.summary(), hide_index=True)
+        files_perf = load_perf.frame()
+        files_perf = files_perf[files_perf["file"].notna()]
+        if not files_perf.empty:
+            st.caption("Por arquivo")
+            st.dataframe(
+                files_perf[["file", "stage", "seconds", "rows", "rows_per_s"]],
+                hide_index=True,
+            )
+        st.caption("Esta execução")
+        st.dataframe(render_perf.summary(), hide_index=True)
+    write_prometheus(Recorder(load_perf.events + render_perf.events))
+
 else:
     st.info("Faça upload de arquivos XML para iniciar a análise.")
@@ -0,0 +1,151 @@
+# benchmarks/run.py
+"""
+Benchmarks do parser, das métricas e das exportações sobre XMLs sintéticos
+(benchmarks.synth). Reporta tempo, vazão (títulos/s, MB/s, linhas/s) e pico
+de memória (heap Python via tracemalloc, medido numa segunda execução para
+não distorcer o tempo).
+
+Uso:
+    python -m benchmarks.run --titulos 200000 --arquivos 4 --jobs 4
+    python -m benchmarks.run --dir /dados/xmls --json resultado.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synth import generate
+from src.export import csv_bytes, xlsx_bytes
+from src.metrics import compute_all_metrics, protocols_multi_by_type
+from src.parser import parse_files_to_dataframe
+
+
+def measure(fn, mem=True):
+    """Executa fn e devolve (resultado, segundos, pico de memória em bytes)."""
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = None
+    if mem:
+        del result
+        tracemalloc.start()
+        try:
+            result = fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(paths, jobs=1, mem=True, excel_rows=50_000):
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    results = []
+
+    def add(stage, seconds, peak, titulos=None, rows=None, nbytes=None):
+        row = {"etapa": stage, "segundos": round(seconds, 4)}
+        if titulos is not None:
+            row["titulos_s"] = round(titulos / seconds) if seconds else None
+        if rows is not None:
+            row["linhas_s"] = round(rows / seconds) if seconds else None
+        if nbytes is not None:
+            row["mb_s"] = round(nbytes / 1e6 / seconds, 2) if seconds else None
+        row["pico_mb"] = round(peak / 1e6, 1) if peak is not None else None
+        results.append(row)
+        print(
+            "  ".join(f"{k}={v}" for k, v in row.items() if v is not None),
+            flush=True,
+        )
+
+    parse_variants = [
+        ("parse (árvore)", dict(streaming=False)),
+        ("parse (streaming)", dict(streaming=True)),
+    ]
+    if jobs > 1:
+        parse_variants.append(
+            (f"parse (streaming, {jobs} jobs)", dict(streaming=True, workers=jobs))
+        )
+    df = None
+    for stage, kwargs in parse_variants:
+        (df, _errors, manifest), secs, peak = measure(
+            lambda: parse_files_to_dataframe(paths, with_manifest=True, **kwargs),
+            mem,
+        )
+        # <titulo> lidos; title_key únicos subcontariam títulos repetidos
+        # entre arquivos
+        n_titulos = int(manifest["titulos_extraidos"].sum())
+        add(stage, secs, peak, titulos=n_titulos, rows=len(df), nbytes=total_bytes)
+
+    _, secs, peak = measure(lambda: compute_all_metrics(df.copy()), mem)
+    add("compute_all_metrics", secs, peak, titulos=n_titulos, rows=len(df))
+
+    _, secs, peak = measure(lambda: protocols_multi_by_type(df, "CPF"), mem)
+    add("protocols_multi_by_type", secs, peak, rows=len(df))
+
+    data, secs, peak = measure(lambda: csv_bytes(df), mem)
+    add("export CSV", secs, peak, rows=len(df), nbytes=len(data))
+
+    data, secs, peak = measure(lambda: csv_bytes(df, compress=True), mem)
+    add("export CSV (gzip)", secs, peak, rows=len(df), nbytes=len(data))
+
+    df_x = df.head(excel_rows)
+    data, secs, peak = measure(lambda: xlsx_bytes({"raw": df_x}), mem)
+    add(f"export Excel ({len(df_x)} linhas)", secs, peak, rows=len(df_x))
+    return results
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    p.add_argument("--dir", help="usa os *.xml deste diretório em vez de gerar")
+    p.add_argument("--titulos", type=int, default=50_000, help="títulos por arquivo")
+    p.add_argument("--arquivos", type=int, default=2)
+    p.add_argument("--devedores", type=int, nargs=2, default=(1, 3))
+    p.add_argument("--telefones", type=int, nargs=2, default=(0, 3))
+    p.add_argument("--namespace", default=None)
+    p.add_argument("--variantes", action="store_true")
+    p.add_argument("--jobs", type=int, default=1)
+    p.add_argument("--excel-linhas", type=int, default=50_000)
+    p.add_argument("--sem-memoria", action="store_true", help="não mede pico")
+    p.add_argument("--json", help="grava os resultados neste arquivo")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dir:
+            paths = sorted(glob.glob(os.path.join(args.dir, "*.xml")))
+        else:
+            paths = []
+            for i in range(args.arquivos):
+                path = os.path.join(tmp, f"bench_{i}.xml")
+                generate(
+                    path,
+                    titulos=args.titulos,
+                    devedores=tuple(args.devedores),
+                    telefones=tuple(args.telefones),
+                    namespace=args.namespace,
+                    variantes=args.variantes,
+                    docs_distintos=max(1, args.titulos // 2),
+                    seed=i,
+                    # numeração própria por arquivo, devedores em comum
+                    primeiro_titulo=i * args.titulos,
+                    seed_documentos=0,
+                )
+                paths.append(path)
+        size = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{len(paths)} arquivos, {size:.1f} MB")
+        results = run(
+            paths,
+            jobs=args.jobs,
+            mem=not args.sem_memoria,
+            excel_rows=args.excel_linhas,
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/synth.py
+"""
+Gerador de XMLs sintéticos no layout
+<carta_cancelamento><titulos><titulo>..., para benchmarks e testes manuais.
+
+Uso:
+    python -m benchmarks.synth saida.xml --titulos 100000 --devedores 1 3
+    python -m benchmarks.synth saida.xml --namespace urn:cra --variantes
+"""
+
+import argparse
+import random
+
+from lxml import etree
+
+# variantes de nome de tag aceitas pelo parser, por campo
+TAG_VARIANTS = {
+    "numerotitulo": ("numerotitulo", "numero_titulo", "NumeroTitulo"),
+    "nome": ("nome", "nome_devedor", "razao_social"),
+    "documento": ("documento", "doc"),
+    "dataprotesto": ("dataprotesto", "data_protesto"),
+    "valorprotestado": ("valorprotestado", "valor"),
+}
+
+
+def _check_digits(base, weights):
+    total = sum(int(d) * w for d, w in zip(base, weights))
+    r = total % 11
+    return "0" if r < 2 else str(11 - r)
+
+
+def make_cpf(rng, formatted=False):
+    base = "".join(rng.choice("0123456789") for _ in range(9))
+    base += _check_digits(base, range(10, 1, -1))
+    base += _check_digits(base, range(11, 1, -1))
+    if formatted:
+        return f"{base[:3]}.{base[3:6]}.{base[6:9]}-{base[9:]}"
+    return base
+
+
+def make_cnpj(rng, formatted=False):
+    base = "".join(rng.choice("0123456789") for _ in range(8)) + "0001"
+    base += _check_digits(base, (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+    base += _check_digits(base, (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+    if formatted:
+        return f"{base[:2]}.{base[2:5]}.{base[5:8]}/{base[8:12]}-{base[12:]}"
+    return base
+
+
+def make_phone(rng):
+    ddd = rng.randint(11, 99)
+    if rng.random() < 0.7:
+        return f"({ddd}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+    return f"{ddd} {rng.randint(2000, 5999)}-{rng.randint(1000, 9999)}"
+
+
+def _pick(rng, lo_hi):
+    lo, hi = lo_hi
+    return rng.randint(lo, hi)
+
+
+def generate(
+    path,
+    titulos=1000,
+    devedores=(1, 2),
+    telefones=(0, 2),
+    mix=(0.6, 0.3, 0.1),
+    namespace=None,
+    variantes=False,
+    docs_distintos=None,
+    seed=0,
+    primeiro_titulo=0,
+    seed_documentos=None,
+):
+    """
+    Grava um XML sintético em `path` (escrita incremental, memória constante).
+
+    titulos: quantidade de <titulo>
+    devedores / telefones: (mín, máx) por título / por devedor
+    mix: proporção (CPF, CNPJ, mascarado) dos documentos
+    namespace: URI do namespace padrão (None = sem namespace)
+    variantes: sorteia nomes de tag alternativos (numero_titulo, razao_social...)
+    docs_distintos: tamanho do conjunto de documentos sorteados (controla
+        quantos devedores se repetem em vários protocolos); None = titulos
+    primeiro_titulo: numeração do primeiro título (protocolo 100000 + n,
+        numerotitulo T + n); arquivos de um mesmo lote devem usar faixas
+        diferentes
+    seed_documentos: se dado, o conjunto de documentos sai dessa seed, e
+        arquivos com a mesma seed_documentos compartilham devedores
+    """
+    rng = random.Random(seed)
+    pool_rng = rng if seed_documentos is None else random.Random(seed_documentos)
+    n_docs = docs_distintos or titulos
+    cpf_w, cnpj_w, _masked_w = mix
+    pool = []
+    for _ in range(n_docs):
+        k = pool_rng.random() * sum(mix)
+        fmt = pool_rng.random() < 0.3
+        if k < cpf_w:
+            pool.append(make_cpf(pool_rng, fmt))
+        elif k < cpf_w + cnpj_w:
+            pool.append(make_cnpj(pool_rng, fmt))
+        else:
+            pool.append(pool_rng.choice(("***.456.789-**", "MASCARADO")))
+    credores = [f"Credor {i:03d} Ltda" for i in range(50)]
+    ns = f"{{{namespace}}}" if namespace else ""
+    nsmap = {None: namespace} if namespace else None
+
+    def tag(field):
+        name = rng.choice(TAG_VARIANTS[field]) if variantes else field
+        return ns + name
+
+    with etree.xmlfile(path, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element(ns + "carta_cancelamento", nsmap=nsmap):
+            cab = etree.Element(ns + "cabecalho", nsmap=nsmap)
+            etree.SubElement(cab, ns + "TotalTitulos").text = str(titulos)
+            xf.write(cab)
+            with xf.element(ns + "titulos"):
+                for i in range(primeiro_titulo, primeiro_titulo + titulos):
+                    t = etree.Element(ns + "titulo", nsmap=nsmap)
+                    etree.SubElement(t, ns + "protocolo").text = str(100000 + i)
+                    etree.SubElement(t, tag("numerotitulo")).text = f"T{i:09d}"
+                    etree.SubElement(t, ns + "credor").text = rng.choice(credores)
+                    etree.SubElement(t, tag("valorprotestado")).text = (
+                        f"{rng.randint(10, 99999)},{rng.randint(0, 99):02d}"
+                    )
+                    etree.SubElement(t, tag("dataprotesto")).text = (
+                        f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+                    )
+                    devs = etree.SubElement(t, ns + "devedores")
+                    for _ in range(_pick(rng, devedores)):
+                        d = etree.SubElement(devs, ns + "devedor")
+                        etree.SubElement(d, tag("nome")).text = (
+                            f"Devedor {rng.randint(0, 10**6)}"
+                        )
+                        etree.SubElement(d, tag("documento")).text = rng.choice(pool)
+                        n_tel = _pick(rng, telefones)
+                        if n_tel:
+                            tels = etree.SubElement(d, ns + "telefones")
+                            for _ in range(n_tel):
+                                etree.SubElement(tels, ns + "telefone").text = (
+                                    make_phone(rng)
+                                )
+                    xf.write(t)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.synth")
+    p.add_argument("path")
+    p.add_argument("--titulos", type=int, default=1000)
+    p.add_argument("--devedores", type=int, nargs=2, default=(1, 2))
+    p.add_argument("--telefones", type=int, nargs=2, default=(0, 2))
+    p.add_argument(
+        "--mix",
+        type=float,
+        nargs=3,
+        default=(0.6, 0.3, 0.1),
+        metavar=("CPF", "CNPJ", "MASCARADO"),
+    )
+    p.add_argument("--namespace", default=None)
+    p.add_argument("--variantes", action="store_true")
+    p.add_argument("--docs-distintos", type=int, default=None)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--primeiro-titulo", type=int, default=0)
+    p.add_argument("--seed-documentos", type=int, default=None)
+    args = p.parse_args(argv)
+    generate(
+        args.path,
+        titulos=args.titulos,
+        devedores=tuple(args.devedores),
+        telefones=tuple(args.telefones),
+        mix=tuple(args.mix),
+        namespace=args.namespace,
+        variantes=args.variantes,
+        docs_distintos=args.docs_distintos,
+        seed=args.seed,
+        primeiro_titulo=args.primeiro_titulo,
+        seed_documentos=args.seed_documentos,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 # app_streamlit_xml_analise_especifico.py
 import streamlit as st
 import pandas as pd
-import io
 import re
+import sys
+from pathlib import Path
 from lxml import etree
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from src.archive import expand_archives
+from src.export import CSV_MIME, XLSX_MIME, ExportCache, csv_bytes, download_button, xlsx_bytes
+from src.parser import declared_total, manifest_frame, manifest_row
+from src.search import SearchIndex
+
 st.set_page_config(
     page_title="Análise XML - Cancelamento (estrutura específica)", layout="wide"
 )
@@ -13,7 +20,7 @@ st.title("Análise de XMLs — Títulos de Cancelamento (parser específico)")
 
 uploaded_files = st.file_uploader(
     "Upload de XMLs (multi) — estrutura: <carta_cancelamento><titulos><titulo>...",
-    type=["xml"],
+    type=["xml", "zip", "gz"],
     accept_multiple_files=True,
 )
 
@@ -91,22 +98,34 @@ def parse_single_xml(file_like):
     Fields:
       - source_file, protocolo, numerotitulo, credor, valorprotestado, dataprotesto, devedor_nome,
         devedor_documento_raw, devedor_documento_clean, devedor_tipo, telefone_raw, telefone_clean
+    Returns (records, error, header); header traz TotalTitulos declarado e o
+    número de <titulo> encontrados, lidos no mesmo parse.
     """
     try:
         tree = etree.parse(file_like)
         root = tree.getroot()
     except Exception as e:
-        return [], f"Erro ao parsear XML: {e}"
+        return [], f"Erro ao parsear XML: {e}", None
 
     records = []
 
     # Navigate to titulos -> titulo
     # Accept either root being <carta_cancelamento> or direct <titulos>
     titulos_nodes = []
-    # find all 'titulo' nodes anywhere
+    total_titulos_raw = None
+    # find all 'titulo' nodes anywhere (and TotalTitulos, in the same pass)
     for elem in root.iter():
-        if etree.QName(elem).localname.lower() == "titulo":
+        if not isinstance(elem.tag, str):
+            continue
+        name = etree.QName(elem).localname.lower()
+        if name == "titulo":
             titulos_nodes.append(elem)
+        elif name == "totaltitulos" and total_titulos_raw is None:
+            total_titulos_raw = first_text(elem)
+    header = {
+        "total_titulos_declarado": declared_total(total_titulos_raw),
+        "titulos_extraidos": len(titulos_nodes),
+    }
 
     # If none found, maybe <titulos> directly contains single <titulo> children
     if not titulos_nodes:
@@ -193,51 +212,42 @@ def parse_single_xml(file_like):
                 }
             )
 
-    return records, None
+    return records, None, header
 
 
 # Main
 if uploaded_files:
+    # exportações geradas só no clique, guardadas por upload + filtros
+    exports = st.session_state.setdefault("exports", ExportCache())
+    upload_key = tuple((f.name, f.size, getattr(f, "file_id", None)) for f in uploaded_files)
     all_records = []
     errors = []
-    total_titulos_declared = None
-
-    for f in uploaded_files:
-        # try to read declared TotalTitulos from file (if present)
-        try:
-            # parse quickly to find TotalTitulos
-            root_try = etree.parse(f).getroot()
-            for elem in root_try.iter():
-                if etree.QName(elem).localname.lower() == "totaltitulos":
-                    txt = (elem.text or "").strip()
-                    if txt:
-                        total_titulos_declared = int(re.sub(r"\D", "", txt))
-                    break
-            # reset file pointer for full parse (if file object supports seek)
-            try:
-                f.seek(0)
-            except Exception:
-                pass
-        except Exception:
-            # ignore read-only peek errors
-            try:
-                f.seek(0)
-            except Exception:
-                pass
-
-        recs, err = parse_single_xml(f)
+    manifest_rows = []
+
+    # .zip / .xml.gz: um arquivo por XML de dentro, sem extrair para disco
+    for f in expand_archives(uploaded_files):
+        recs, err, header = parse_single_xml(f)
         if err:
             errors.append(f"{f.name}: {err}")
         else:
             for r in recs:
                 r["source_file"] = f.name
             all_records.extend(recs)
+        manifest_rows.append(manifest_row(f.name, header, len(recs), err))
 
     if errors:
         st.warning("Alguns arquivos apresentaram erro ao parsear:")
         for e in errors:
             st.write("- " + e)
 
+    # TotalTitulos declarado x títulos extraídos, para cada arquivo
+    manifest = manifest_frame(manifest_rows)
+    n_div = int(manifest["divergente"].fillna(False).sum())
+    if n_div:
+        st.warning(f"{n_div} arquivo(s) com TotalTitulos diferente do número de títulos extraídos.")
+    with st.expander("Conferência por arquivo (TotalTitulos)", expanded=bool(n_div)):
+        st.dataframe(manifest, hide_index=True)
+
     if not all_records:
         st.info("Nenhum registro de devedor extraído. Verifique a estrutura dos XMLs.")
     else:
@@ -311,12 +321,12 @@ if uploaded_files:
         st.subheader("Devedores (CPF) com mais de 1 protocolo único")
         st.write("Documentos classificados como CPF que aparecem em mais de um protocolo (protocolos únicos listados).")
         st.dataframe(df_cpf_multi, height=250)
-        st.download_button("Baixar: CPFs com >1 protocolo (CSV)", data=df_cpf_multi.to_csv(index=False).encode("utf-8"), file_name="cpfs_multi_protocolos.csv", mime="text/csv")
+        download_button(st, "Baixar: CPFs com >1 protocolo (CSV)", exports.deferred(("cpf_multi", upload_key), lambda: csv_bytes(df_cpf_multi)), file_name="cpfs_multi_protocolos.csv", mime=CSV_MIME)
 
         st.subheader("Devedores (CNPJ) com mais de 1 protocolo único")
         st.write("Documentos classificados como CNPJ que aparecem em mais de um protocolo (protocolos únicos listados).")
         st.dataframe(df_cnpj_multi, height=250)
-        st.download_button("Baixar: CNPJs com >1 protocolo (CSV)", data=df_cnpj_multi.to_csv(index=False).encode("utf-8"), file_name="cnpjs_multi_protocolos.csv", mime="text/csv")
+        download_button(st, "Baixar: CNPJs com >1 protocolo (CSV)", exports.deferred(("cnpj_multi", upload_key), lambda: csv_bytes(df_cnpj_multi)), file_name="cnpjs_multi_protocolos.csv", mime=CSV_MIME)
         # --- FIM DO TRECHO ---
         
         
@@ -326,9 +336,6 @@ if uploaded_files:
         grouped = df.groupby("title_key")
 
         total_titulos = df["protocolo"].nunique()
-        # If file declared TotalTitulos and there's only one uploaded file, consider showing it for comparison
-        if total_titulos_declared is not None and len(uploaded_files) == 1:
-            st.info(f"TotalTitulos declarado no XML: {total_titulos_declared}")
 
         titles_with_phone = int(grouped["has_telefone_row"].any().sum())
 
@@ -398,13 +405,7 @@ if uploaded_files:
         if selected_types:
             mask &= df["devedor_tipo"].fillna("UNKNOWN").isin(selected_types)
         if text_search:
-            ts = text_search.lower()
-            mask &= df.apply(
-                lambda r: ts in str(r.get("devedor_nome") or "").lower()
-                or ts in str(r.get("devedor_documento_raw") or "").lower()
-                or ts in str(r.get("devedor_documento") or ""),
-                axis=1,
-            )
+            mask &= SearchIndex(df).mask(text_search)
 
         df_filtered = df[mask].copy()
 
@@ -459,25 +460,25 @@ if uploaded_files:
         )
         st.dataframe(agg, height=350)
 
-        # Export options
-        csv_bytes = df_filtered.to_csv(index=False).encode("utf-8")
-        st.download_button(
+        # Export options (gerados só no clique)
+        filter_state = (upload_key, tuple(selected_files), tuple(selected_types), text_search)
+        download_button(
+            st,
             "Baixar tabela filtrada (CSV)",
-            data=csv_bytes,
+            exports.deferred(("filtrado", filter_state), lambda: csv_bytes(df_filtered)),
             file_name="titulos_devedores_filtrados.csv",
-            mime="text/csv",
+            mime=CSV_MIME,
         )
 
-        to_excel = io.BytesIO()
-        with pd.ExcelWriter(to_excel, engine="openpyxl") as writer:
-            df_filtered.to_excel(writer, sheet_name="raw", index=False)
-            agg.to_excel(writer, sheet_name="por_titulo", index=False)
-        to_excel.seek(0)
-        st.download_button(
+        download_button(
+            st,
             "Baixar relatório (Excel)",
-            data=to_excel,
+            exports.deferred(
+                ("relatorio", filter_state),
+                lambda: xlsx_bytes({"raw": df_filtered, "por_titulo": agg}),
+            ),
             file_name="relatorio_titulos.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            mime=XLSX_MIME,
         )
 
         st.success("Análise concluída.")
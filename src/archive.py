@@ -0,0 +1,175 @@
+# src/archive.py
+"""
+Entradas compactadas: .zip com vários XMLs e .xml.gz.
+
+expand_archives troca cada arquivo compactado pelos XMLs de dentro, como
+file-likes (ArchiveMember) que descompactam sob demanda: nada é extraído
+para disco e o parser (inclusive o iterparse do modo streaming) lê direto
+do membro. Arquivos locais são abertos via mmap.
+"""
+
+import gzip
+import io
+import mmap
+import os
+import zipfile
+
+ZIP_MAGIC = b"PK\x03\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _peek(f, n=4):
+    """Primeiros n bytes de um caminho ou file-like (sem mover a posição)."""
+    if isinstance(f, (str, os.PathLike)):
+        with open(f, "rb") as fh:
+            return fh.read(n)
+    pos = f.tell()
+    try:
+        return f.read(n)
+    finally:
+        f.seek(pos)
+
+
+def archive_kind(f):
+    """ "zip", "gzip" ou None (XML comum, ou não deu para ler)."""
+    try:
+        head = _peek(f)
+    except Exception:
+        return None
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    return None
+
+
+class MappedFile(mmap.mmap):
+    """mmap com seekable(), que o zipfile exige do objeto de arquivo."""
+
+    def seekable(self):
+        return True
+
+
+def map_file(path):
+    """
+    Arquivo local mapeado em memória, somente leitura, como file-like
+    (fica aberto enquanto houver referência).
+    """
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return io.BytesIO(b"")
+        return MappedFile(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _is_xml_member(info):
+    name = info.filename
+    base = name.rsplit("/", 1)[-1]
+    return (
+        not info.is_dir()
+        and name.lower().endswith(".xml")
+        and not name.startswith("__MACOSX/")
+        and not base.startswith("._")
+    )
+
+
+class ArchiveMember:
+    """
+    File-like somente leitura de um XML dentro de um .zip ou .xml.gz.
+
+    name é "arquivo.zip/membro.xml" (ou o próprio nome do .xml.gz). O
+    conteúdo é descompactado conforme é lido; seek(0) recomeça do início.
+    spec, quando o compactado é um arquivo local, é uma tupla
+    (tipo, caminho, membro) que permite reabrir o membro em outro processo
+    (ver open_member).
+    """
+
+    def __init__(self, name, opener, spec=None):
+        self.name = name
+        self.spec = spec
+        self._opener = opener
+        self._stream = None
+
+    def _get_stream(self):
+        if self._stream is None:
+            self._stream = self._opener()
+        return self._stream
+
+    def read(self, size=-1):
+        return self._get_stream().read(size)
+
+    def seek(self, offset, whence=0):
+        if offset == 0 and whence == 0:
+            self.close()
+            return 0
+        return self._get_stream().seek(offset, whence)
+
+    def tell(self):
+        return self._stream.tell() if self._stream is not None else 0
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+def _raiser(exc):
+    def opener():
+        raise exc
+
+    return opener
+
+
+def _gzip_opener(source):
+    def opener():
+        source.seek(0)
+        return gzip.GzipFile(fileobj=source, mode="rb")
+
+    return opener
+
+
+def open_member(spec):
+    """Reabre um membro a partir de ArchiveMember.spec."""
+    kind, path, member = spec
+    if kind == "zip":
+        zf = zipfile.ZipFile(map_file(path))
+        return ArchiveMember(f"{path}/{member}", lambda: zf.open(member), spec)
+    return ArchiveMember(path, _gzip_opener(map_file(path)), spec)
+
+
+def expand_archives(file_objs):
+    """
+    Gera os arquivos de file_objs com os .zip trocados pelos seus membros
+    .xml (na ordem do zip) e os .gz pelo conteúdo descompactado. Os demais
+    passam sem mudança. Um .zip ilegível vira um ArchiveMember que falha ao
+    ser lido, para o erro aparecer como erro de parse daquele arquivo.
+    """
+    for f in file_objs:
+        kind = archive_kind(f)
+        if kind is None:
+            yield f
+            continue
+        local = isinstance(f, (str, os.PathLike))
+        name = os.fspath(f) if local else getattr(f, "name", "uploaded")
+        source = map_file(f) if local else f
+        if kind == "gzip":
+            spec = ("gzip", name, None) if local else None
+            yield ArchiveMember(name, _gzip_opener(source), spec)
+            continue
+        try:
+            if not local:
+                f.seek(0)
+            zf = zipfile.ZipFile(source)
+        except (zipfile.BadZipFile, OSError, ValueError) as e:
+            # (o mmap levanta ValueError num zip truncado)
+            err = zipfile.BadZipFile(f"arquivo zip inválido ({e})")
+            yield ArchiveMember(name, _raiser(err))
+            continue
+        for info in zf.infolist():
+            if not _is_xml_member(info):
+                continue
+            spec = ("zip", name, info.filename) if local else None
+            yield ArchiveMember(
+                f"{name}/{info.filename}",
+                lambda zf=zf, member=info.filename: zf.open(member),
+                spec,
+            )
@@ -0,0 +1,121 @@
+# src/cache.py
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# chave dos metadados por arquivo (ex.: cabeçalho do XML) no schema Parquet
+META_KEY = b"xml_utils.meta"
+
+
+class ParseCache:
+    """
+    Cache em disco do resultado do parse, endereçado pelo conteúdo do arquivo.
+
+    Cada entrada é um Parquet com os registros (colunar) de um arquivo, com
+    chave sha256(conteúdo) + versão do parser, e um dict de metadados do
+    arquivo (JSON nos metadados do schema). O tamanho total é limitado a
+    `max_bytes`; ao estourar, as entradas menos usadas recentemente (mtime,
+    atualizado a cada acerto) são removidas.
+
+    hits / misses contam acertos e faltas desde a criação do objeto.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content_hash, version):
+        return f"{content_hash}-v{version}"
+
+    def _path(self, key):
+        return self.directory / f"{key}.parquet"
+
+    def get(self, key):
+        """
+        (colunas, meta) da entrada, ou None se não existir: colunas é um dict
+        coluna -> lista e meta o dict gravado em put (None se não houver).
+        """
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+            os.utime(path)  # LRU: marca como usado agora
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        raw = (table.schema.metadata or {}).get(META_KEY)
+        meta = json.loads(raw) if raw is not None else None
+        return {c: table.column(c).to_pylist() for c in table.column_names}, meta
+
+    def put(self, key, columns, meta=None):
+        path = self._path(key)
+        # grava num temporário e renomeia: leitores nunca veem arquivo parcial
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            table = pa.table(columns)
+            if meta is not None:
+                table = table.replace_schema_metadata(
+                    {**(table.schema.metadata or {}), META_KEY: json.dumps(meta)}
+                )
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self):
+        """Remove as entradas menos usadas até caber em max_bytes."""
+        entries = []
+        for p in self.directory.glob("*.parquet"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def content_hash(f, chunk_size=1024 * 1024):
+    """sha256 do conteúdo de um caminho ou file-like (volta ao início)."""
+    h = hashlib.sha256()
+    if isinstance(f, (str, os.PathLike)):
+        # arquivo local: mmap, sem copiar o conteúdo para a memória do Python
+        with open(f, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    h.update(mm)
+        return h.hexdigest()
+    try:
+        f.seek(0)
+    except Exception:
+        pass
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+        h.update(chunk)
+    try:
+        f.seek(0)
+    except Exception:
+        pass
+    return h.hexdigest()
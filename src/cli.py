@@ -0,0 +1,260 @@
+# src/cli.py
+"""
+Análise em lote, sem interface: parseia diretórios/globs de XMLs e grava a
+tabela de registros, as métricas e as tabelas de multi-protocolo.
+
+Uso:
+    python -m src.cli /dados/xmls --jobs 8 --out resultado/
+    python -m src.cli "/dados/2024-*/**/*.xml" --format csv --out resultado/
+    python -m src.cli /dados/xmls --store historico.sqlite --out resultado/
+    python -m src.cli /dados/lote-0612 --history devedores.npz --batch 2024-06-12
+
+Não importa streamlit nem plotly, para subir rápido em cron.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.archive import expand_archives
+from src.cache import ParseCache, content_hash
+from src.history import DebtorIndex, batch_key
+from src.export import write_csv
+from src.instrument import Recorder, configure_logging, stage, write_prometheus
+from src.metrics import compute_all_metrics
+from src.parser import parse_files_to_dataframe, source_names
+from src.store import RecordStore
+
+INPUT_PATTERNS = ("*.xml", "*.zip", "*.xml.gz")
+
+
+def expand_inputs(inputs):
+    """
+    Diretórios viram os *.xml / *.zip / *.xml.gz de dentro; o resto é tratado
+    como glob. Os compactados são lidos pelo parser (src.archive).
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in INPUT_PATTERNS:
+                paths.extend(sorted(glob.glob(os.path.join(item, pattern))))
+        else:
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+    # remove repetidos mantendo a ordem
+    return list(dict.fromkeys(paths))
+
+
+def write_table(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path.with_suffix(".parquet"), index=False)
+    else:
+        with open(path.with_suffix(".csv"), "wb") as fh:
+            write_csv(df, fh)
+
+
+def write_table_chunks(frames, path, fmt):
+    """write_table para uma sequência de DataFrames (gravados um a um)."""
+    if fmt == "csv":
+        with open(path.with_suffix(".csv"), "wb") as fh:
+            for i, df in enumerate(frames):
+                data = df.to_csv(index=False, header=i == 0)
+                fh.write(data.encode("utf-8"))
+        return
+    writer = None
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                # categorias mudam de bloco para bloco: índices int32 em todos
+                schema = pa.schema(
+                    (
+                        f.with_type(pa.dictionary(pa.int32(), f.type.value_type))
+                        if pa.types.is_dictionary(f.type)
+                        else f
+                    )
+                    for f in table.schema
+                ).with_metadata(table.schema.metadata)
+                writer = pq.ParquetWriter(path.with_suffix(".parquet"), schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def check_history(args, paths, records, out, summary):
+    """
+    Consulta o lote (records: dict com devedor_documento e protocolo) no
+    índice de args.history, grava reincidentes.csv e registra o lote, se
+    ainda não estiver lá.
+    """
+    index = DebtorIndex.load(args.history)
+    key = batch_key(content_hash(p) for p in paths)
+    registered = index.has_batch(key)
+    with stage("historico", rows=len(records["devedor_documento"])):
+        repeat = index.lookup(
+            records["devedor_documento"], before=key if registered else None
+        )
+        if registered:
+            print(
+                "aviso: lote já registrado no histórico; não foi registrado de novo",
+                file=sys.stderr,
+            )
+        else:
+            label = args.batch or datetime.now().isoformat(timespec="seconds")
+            index.add_batch(
+                label, records["devedor_documento"], records["protocolo"], key=key
+            )
+            index.save(args.history)
+    repeat.to_csv(out / "reincidentes.csv", index=False)
+    summary["devedores_reincidentes"] = int(len(repeat))
+
+
+def build_parser():
+    p = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Análise em lote de XMLs de carta de cancelamento.",
+    )
+    p.add_argument("inputs", nargs="+", help="diretórios ou globs de arquivos XML")
+    p.add_argument("-o", "--out", default="saida", help="diretório de saída")
+    p.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="processos para o parse (padrão: 1)",
+    )
+    p.add_argument(
+        "--format",
+        choices=("parquet", "csv"),
+        default="parquet",
+        help="formato da tabela de registros (padrão: parquet)",
+    )
+    p.add_argument(
+        "--store",
+        default=None,
+        help="banco SQLite onde os registros são acumulados entre execuções; "
+        "métricas e saídas passam a ser de todo o banco, calculadas em SQL "
+        "(para lotes maiores que a memória)",
+    )
+    p.add_argument(
+        "--history",
+        default=None,
+        help="índice de devedores dos lotes anteriores (.npz): os documentos "
+        "deste lote já vistos vão para reincidentes.csv e o lote é registrado",
+    )
+    p.add_argument(
+        "--batch",
+        default=None,
+        help="rótulo do lote no --history (padrão: data e hora atuais)",
+    )
+    p.add_argument(
+        "--cache-dir",
+        default=None,
+        help="diretório do cache de parse (desligado se omitido)",
+    )
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("Nenhum arquivo XML encontrado.", file=sys.stderr)
+        return 1
+
+    configure_logging()
+    perf = Recorder()
+    cache = ParseCache(args.cache_dir) if args.cache_dir else None
+    store = RecordStore(args.store) if args.store else None
+    try:
+        return run(args, paths, cache, store, perf)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def run(args, paths, cache, store, perf):
+    with perf.activate():
+        if store is not None:
+            errors = store.add_files(
+                paths, streaming=True, workers=args.jobs, cache=cache
+            )
+            manifest = store.manifest
+            n_rows = len(store)
+        else:
+            df, errors, manifest = parse_files_to_dataframe(
+                paths,
+                streaming=True,
+                workers=args.jobs,
+                cache=cache,
+                with_manifest=True,
+            )
+            n_rows = len(df)
+    for e in errors:
+        print(f"erro: {e}", file=sys.stderr)
+    divergentes = manifest[manifest["divergente"].fillna(False)]
+    for row in divergentes.itertuples(index=False):
+        print(
+            f"aviso: {row.source_file}: TotalTitulos={row.total_titulos_declarado}, "
+            f"extraídos={row.titulos_extraidos}",
+            file=sys.stderr,
+        )
+    if not n_rows:
+        print("Nenhum registro extraído.", file=sys.stderr)
+        return 1
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    with perf.activate():
+        if store is not None:
+            metrics = store.metrics()
+            with stage("escrita", rows=n_rows):
+                write_table_chunks(store.iter_frames(), out / "registros", args.format)
+        else:
+            metrics = compute_all_metrics(df)
+            with stage("escrita", rows=n_rows):
+                write_table(df, out / "registros", args.format)
+    manifest.to_csv(out / "manifesto.csv", index=False)
+    metrics["df_cpf_multi"].to_csv(out / "cpfs_multi_protocolos.csv", index=False)
+    metrics["df_cnpj_multi"].to_csv(out / "cnpjs_multi_protocolos.csv", index=False)
+
+    summary = {k: v for k, v in metrics.items() if not k.startswith("df_")}
+    summary["arquivos"] = len(manifest)
+    summary["registros"] = int(n_rows)
+    summary["parse_errors"] = errors
+    summary["arquivos_divergentes"] = int(len(divergentes))
+    if cache is not None:
+        summary["cache"] = cache.stats()
+    if args.history:
+        columns = ["devedor_documento", "protocolo"]
+        if store is not None:
+            names = [source_names(f)[0] for f in expand_archives(paths)]
+            records = store.select_columns(columns, names)
+        else:
+            records = {c: df[c].to_numpy(dtype=object) for c in columns}
+        with perf.activate():
+            check_history(args, paths, records, out, summary)
+    etapas = perf.summary()
+    summary["etapas"] = (
+        etapas.astype(object).where(etapas.notna(), None).to_dict("records")
+    )
+    write_prometheus(perf)
+    with open(out / "metricas.json", "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, ensure_ascii=False, indent=2)
+
+    print(
+        f"{len(manifest)} arquivos, {n_rows} registros, "
+        f"{summary['total_titulos']} títulos -> {out}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# src/cube.py
+"""
+Cubo de agregados parciais por (source_file, devedor_tipo), para as métricas
+acompanharem os filtros do app sem reprocessar os registros.
+
+Títulos, documentos e protocolos são fatorados uma vez para o dataset
+inteiro (códigos int; documentos e protocolos em ordem lexicográfica). Cada
+célula guarda, para as linhas daquele arquivo e tipo:
+  - os títulos (códigos) com as flags telefone / CPF / CNPJ / celular
+    válido e o valor;
+  - os documentos distintos, como array ordenado;
+  - os pares distintos (documento, protocolo), como array ordenado de
+    doc * n_protocolos + protocolo: a contagem de protocolos por documento
+    sai da união dos pares das células (somar contagens contaria duas vezes
+    um protocolo presente em dois arquivos);
+  - os hashes distintos dos telefones normalizados (phones_frame), pelo
+    mesmo motivo.
+
+metrics(files, tipos) funde as células selecionadas com operações NumPy e
+devolve o mesmo dict de compute_all_metrics sobre as linhas filtradas.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.instrument import stage
+from src.metrics import MULTI_COLUMNS, stripped_text
+from src.parser import phones_frame
+
+PHONE, CPF, CNPJ, MOBILE = 1, 2, 4, 8
+NO_VALUE = np.iinfo(np.int64).min
+
+
+def _codes(values):
+    """(códigos int64, valores distintos em ordem); nulos têm código -1."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=True)
+    return codes.astype(np.int64), np.asarray(uniques, dtype=object)
+
+
+def _runs(*keys):
+    """Ordem lexicográfica por keys (a primeira é a principal) e início de cada run."""
+    order = np.lexsort(keys[::-1])
+    change = np.zeros(len(order), dtype=bool)
+    change[:1] = True
+    for k in keys:
+        sk = k[order]
+        change[1:] |= sk[1:] != sk[:-1]
+    return order, np.flatnonzero(change)
+
+
+def _split(cells, values, n_cells):
+    """Fatia values (ordenado por cells) em uma lista por célula."""
+    bounds = np.searchsorted(cells, np.arange(n_cells + 1))
+    return [values[bounds[i] : bounds[i + 1]] for i in range(n_cells)]
+
+
+class MetricsCube:
+    """
+    Agregados por (source_file, devedor_tipo) de um dataframe do parser
+    (com title_key), ver o docstring do módulo. devedor_tipo nulo conta como
+    "UNKNOWN", como no filtro do app.
+
+    metrics(files=None, tipos=None): None seleciona todos os valores. Os
+    resultados ficam num cache LRU por seleção.
+    """
+
+    def __init__(self, df, cache_size=32):
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        with stage("cube", rows=len(df)):
+            self._build(df)
+
+    def _build(self, df):
+        file_codes, self.files = _codes(df["source_file"])
+        tipo_codes, self.tipos = _codes(
+            df["devedor_tipo"].astype(object).fillna("UNKNOWN")
+        )
+        n_tipos = max(len(self.tipos), 1)
+        cell = file_codes * n_tipos + tipo_codes
+        self.n_cells = len(self.files) * n_tipos
+        self._n_tipos = n_tipos
+
+        # títulos: flags OR e valor máximo por (célula, título)
+        title, _ = _codes(df["title_key"])
+        self.n_titles = int(title.max()) + 1 if len(title) else 0
+        tipo = df["devedor_tipo"]
+        phones = phones_frame(df)
+        registro = phones["registro"].to_numpy()
+        mobile = np.zeros(len(df), dtype=bool)
+        mobile[registro[phones["celular"].to_numpy()]] = True
+        bits = (
+            stripped_text(df["telefone"])[1] * PHONE
+            + tipo.eq("CPF").to_numpy(dtype=bool) * CPF
+            + tipo.eq("CNPJ").to_numpy(dtype=bool) * CNPJ
+            + mobile * MOBILE
+        ).astype(np.uint8)
+        if "valor_centavos" in df.columns:
+            valor = (
+                df["valor_centavos"]
+                .astype("Int64")
+                .to_numpy(dtype=np.int64, na_value=NO_VALUE)
+            )
+        else:
+            valor = np.full(len(df), NO_VALUE, dtype=np.int64)
+        order, starts = _runs(cell, title)
+        run_cells = cell[order][starts]
+        self._titles = _split(run_cells, title[order][starts], self.n_cells)
+        self._bits = _split(
+            run_cells,
+            np.bitwise_or.reduceat(bits[order], starts) if len(order) else bits,
+            self.n_cells,
+        )
+        self._valor = _split(
+            run_cells,
+            np.maximum.reduceat(valor[order], starts) if len(order) else valor,
+            self.n_cells,
+        )
+
+        # documentos e pares (documento, protocolo) distintos por célula
+        doc, self.docs = _codes(df["devedor_documento"])
+        prot_txt, prot_ok = stripped_text(df["protocolo"])
+        has_doc = doc >= 0
+        c, d = cell[has_doc], doc[has_doc]
+        order, starts = _runs(c, d)
+        self._docs = _split(c[order][starts], d[order][starts], self.n_cells)
+
+        with_prot = has_doc & prot_ok
+        prot, self.protocolos = _codes(prot_txt[with_prot])
+        self.n_prot = max(len(self.protocolos), 1)
+        c = cell[with_prot]
+        pair = doc[with_prot] * self.n_prot + prot
+        order, starts = _runs(c, pair)
+        self._pairs = _split(c[order][starts], pair[order][starts], self.n_cells)
+
+        # telefones distintos por célula, como hashes
+        c = cell[registro]
+        h = pd.util.hash_array(phones["telefone"].to_numpy(dtype=object))
+        order, starts = _runs(c, h)
+        self._phones = _split(c[order][starts], h[order][starts], self.n_cells)
+
+    def _cells(self, files, tipos):
+        f = np.arange(len(self.files))
+        if files is not None:
+            f = f[np.isin(self.files, list(files))]
+        t = np.arange(len(self.tipos))
+        if tipos is not None:
+            t = t[np.isin(self.tipos, list(tipos))]
+        return (f[:, None] * self._n_tipos + t[None, :]).ravel()
+
+    def metrics(self, files=None, tipos=None):
+        """Mesmo dict de compute_all_metrics sobre as linhas selecionadas."""
+        key = (
+            None if files is None else tuple(sorted(files)),
+            None if tipos is None else tuple(sorted(tipos)),
+        )
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        with stage("cube_metrics"):
+            result = self._metrics(self._cells(files, tipos))
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _metrics(self, cells):
+        seen = np.zeros(self.n_titles, dtype=bool)
+        bits = np.zeros(self.n_titles, dtype=np.uint8)
+        valor = np.full(self.n_titles, NO_VALUE, dtype=np.int64)
+        for c in cells:
+            # cada título aparece uma vez por célula
+            ids = self._titles[c]
+            seen[ids] = True
+            bits[ids] |= self._bits[c]
+            valor[ids] = np.maximum(valor[ids], self._valor[c])
+        bits, valor = bits[seen], valor[seen]
+        has_cpf = (bits & CPF) > 0
+        has_cnpj = (bits & CNPJ) > 0
+        has_valor = valor != NO_VALUE
+        cents = np.where(has_valor, valor, 0)
+        titles_with_valor = int(has_valor.sum())
+        valor_total = int(cents.sum())
+
+        tipo_of = self._cell_tipos(cells)
+        cpf_docs = self._union(self._docs, cells[tipo_of == "CPF"])
+        cnpj_docs = self._union(self._docs, cells[tipo_of == "CNPJ"])
+        all_docs = self._union(self._docs, cells)
+
+        pairs = self._union(self._pairs, cells)
+        pair_docs = pairs // self.n_prot
+        docs, counts = np.unique(pair_docs, return_counts=True)
+        multi = docs[counts > 1]
+        df_cpf_multi = self._multi_frame(pairs, pair_docs, multi, cpf_docs)
+        df_cnpj_multi = self._multi_frame(pairs, pair_docs, multi, cnpj_docs)
+        return {
+            "total_titulos": int(seen.sum()),
+            "titles_with_phone": int(((bits & PHONE) > 0).sum()),
+            "titles_with_cpf": int(has_cpf.sum()),
+            "titles_with_cnpj": int(has_cnpj.sum()),
+            "titles_with_both": int((has_cpf & has_cnpj).sum()),
+            "titles_with_valid_mobile": int(((bits & MOBILE) > 0).sum()),
+            "unique_phones": len(self._union(self._phones, cells)),
+            "qtd_cpfs_unicos": len(cpf_docs),
+            "qtd_cnpjs_unicos": len(cnpj_docs),
+            "unique_devedores_total": len(all_docs),
+            "titles_with_valor": titles_with_valor,
+            "valor_total_centavos": valor_total,
+            "valor_medio_centavos": (
+                valor_total / titles_with_valor if titles_with_valor else 0.0
+            ),
+            "valor_cpf_centavos": int(cents[has_cpf].sum()),
+            "valor_cnpj_centavos": int(cents[has_cnpj].sum()),
+            "df_cpf_multi": df_cpf_multi,
+            "df_cnpj_multi": df_cnpj_multi,
+            "cpf_multi_count": len(df_cpf_multi),
+            "cnpj_multi_count": len(df_cnpj_multi),
+        }
+
+    def _cell_tipos(self, cells):
+        return self.tipos[cells % self._n_tipos] if len(self.tipos) else cells
+
+    @staticmethod
+    def _union(parts, cells):
+        if not len(cells):
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([parts[c] for c in cells]))
+
+    def _multi_frame(self, pairs, pair_docs, multi, docs):
+        """Tabela de MULTI_COLUMNS dos documentos de multi que estão em docs."""
+        selected = np.intersect1d(multi, docs, assume_unique=True)
+        if not len(selected):
+            return pd.DataFrame(columns=MULTI_COLUMNS)
+        # pares já em ordem (documento, protocolo), como em _multi_summary
+        keep = np.isin(pair_docs, selected)
+        prot = pd.Series(self.protocolos[pairs[keep] % self.n_prot])
+        joined = prot.groupby(pair_docs[keep], sort=True).agg(", ".join)
+        return pd.DataFrame(
+            {
+                "devedor_documento": self.docs[selected],
+                "qtd_protocolos_unicos": np.bincount(
+                    np.searchsorted(selected, pair_docs[keep]), minlength=len(selected)
+                ).astype(np.int64),
+                "protocolos_unicos": joined.to_numpy(),
+            }
+        )
@@ -0,0 +1,165 @@
+# src/dataset.py
+import threading
+
+import pandas as pd
+
+from src.archive import expand_archives
+from src.metrics import merge_partials, metric_partials, metrics_from_partials
+from src.parser import (
+    compute_title_key,
+    concat_records,
+    iter_parse_files,
+    manifest_frame,
+    manifest_row,
+    records_frame,
+    source_names,
+)
+
+
+class IncrementalDataset:
+    """
+    Conjunto de arquivos XML parseados com métricas incrementais.
+
+    Cada arquivo é parseado uma única vez ao ser adicionado e guarda seus
+    agregados parciais (src.metrics.metric_partials). Adicionar ou remover
+    um arquivo só mexe nos dados daquele arquivo; as métricas saem da fusão
+    dos parciais e são idênticas às de compute_all_metrics sobre o
+    parse_files_to_dataframe de todos os arquivos, na mesma ordem.
+
+    Os arquivos são identificados pelo nome (source_file); adicionar de novo
+    um nome existente substitui o arquivo anterior, na mesma posição. Um .zip
+    entra como um arquivo por membro ("lote.zip/a.xml"), e remove_file do
+    nome do .zip remove todos eles.
+
+    Pode ser lido de outra thread enquanto add_files roda (ex.: o app
+    parseando em segundo plano): os arquivos entram um a um, conforme ficam
+    prontos, e version aumenta a cada mudança.
+    """
+
+    def __init__(self, streaming=True, workers=None, cache=None):
+        self.streaming = streaming
+        self.workers = workers
+        self.cache = cache
+        self._files = {}
+        self._seq = 0
+        self._df = None
+        self._merged = None
+        self._lock = threading.RLock()
+        self.version = 0
+
+    def add_file(self, f):
+        """Parseia e adiciona um arquivo. Retorna a lista de erros dele."""
+        return self.add_files([f])
+
+    def add_files(self, files, on_result=None):
+        """
+        Parseia (em paralelo, se workers > 1) e adiciona arquivos.
+        Retorna a lista de erros desses arquivos.
+
+        Cada arquivo fica visível assim que é parseado; até lá um arquivo
+        novo aparece só em names (o manifesto, df e as métricas o ignoram). on_result, se
+        dado, é chamado com (nome, nº de registros, erro) a cada arquivo.
+        """
+        files = list(expand_archives(files))
+        names = [source_names(f)[0] for f in files]
+        with self._lock:
+            # reserva as posições dos arquivos novos na ordem de entrada; um
+            # nome existente mantém a entrada anterior até ser substituído
+            for name in names:
+                self._files.setdefault(name, None)
+            self._invalidate()
+        errors = []
+        for i, (cols, err, header) in iter_parse_files(
+            files, streaming=self.streaming, workers=self.workers, cache=self.cache
+        ):
+            entry = self._entry(names[i], cols, err, header)
+            with self._lock:
+                if names[i] in self._files:  # pode ter sido removido no meio
+                    self._files[names[i]] = entry
+                    self._invalidate()
+            if err is not None:
+                errors.append(err)
+            if on_result is not None:
+                on_result(names[i], len(entry["df"]), err)
+        return errors
+
+    def _entry(self, name, cols, err, header):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        entry = {"df": pd.DataFrame(), "errors": [], "partials": None}
+        if err is not None:
+            entry["errors"].append(err)
+        else:
+            df = records_frame(cols)
+            entry["df"] = df
+            if not df.empty:
+                # ROWIDX:<i> só é único dentro do arquivo: prefixa com um
+                # token próprio para não colidir com linhas de outros
+                local = df.set_axis(f"{seq}:" + df.index.astype(str))
+                local = local.assign(title_key=compute_title_key(local))
+                entry["partials"] = metric_partials(local)
+        entry["manifest"] = manifest_row(name, header, len(entry["df"]), err)
+        return entry
+
+    def remove_file(self, name):
+        """Remove o arquivo (ou, para um .zip, todos os seus membros)."""
+        with self._lock:
+            names = [n for n in self._files if n == name or n.startswith(name + "/")]
+            for n in names:
+                del self._files[n]
+            if names:
+                self._invalidate()
+
+    def _invalidate(self):
+        self._df = None
+        self._merged = None
+        self.version += 1
+
+    def _ready(self):
+        """Entradas dos arquivos já parseados, na ordem."""
+        with self._lock:
+            return [e for e in self._files.values() if e is not None]
+
+    @property
+    def names(self):
+        with self._lock:
+            return list(self._files)
+
+    @property
+    def errors(self):
+        return [e for entry in self._ready() for e in entry["errors"]]
+
+    @property
+    def manifest(self):
+        """Manifesto por arquivo (ver src.parser.manifest_frame)."""
+        return manifest_frame(e["manifest"] for e in self._ready())
+
+    @property
+    def df(self):
+        """Registros de todos os arquivos, com title_key global."""
+        with self._lock:
+            if self._df is None:
+                frames = [e["df"] for e in self._ready() if not e["df"].empty]
+                self._df = concat_records(frames) if frames else pd.DataFrame()
+            return self._df
+
+    def _partials(self):
+        with self._lock:
+            if self._merged is None:
+                self._merged = merge_partials(
+                    e["partials"] for e in self._ready() if e["partials"] is not None
+                )
+            return self._merged
+
+    def metrics(self):
+        """Mesmo dict de compute_all_metrics, a partir dos parciais fundidos."""
+        return metrics_from_partials(self._partials())
+
+    def cpf_cnpj_lists(self):
+        """Mesmo resultado de make_cpf_cnpj_lists(self.df)."""
+        doc_tipos = self._partials()["doc_tipos"]
+        tipo = doc_tipos["devedor_tipo"]
+        cpfs = sorted(doc_tipos.loc[tipo == "CPF", "devedor_documento"].unique())
+        cnpjs = sorted(doc_tipos.loc[tipo == "CNPJ", "devedor_documento"].unique())
+        return cpfs, cnpjs
@@ -0,0 +1,118 @@
+# src/export.py
+"""
+Exportações (CSV / Excel) geradas sob demanda.
+
+O CSV é escrito em blocos de linhas (opcionalmente em gzip) e o Excel usa o
+modo write-only do openpyxl, que grava as linhas direto no arquivo em vez de
+montar a planilha inteira em memória. ExportCache guarda o resultado por
+estado de filtro, para reruns e cliques repetidos não regerarem o arquivo.
+"""
+
+import gzip
+import io
+import threading
+from collections import OrderedDict
+
+from openpyxl import Workbook
+
+CHUNK_ROWS = 50_000
+CSV_MIME = "text/csv"
+GZIP_MIME = "application/gzip"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def iter_csv_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Texto CSV do df (cabeçalho + linhas, sem índice) em blocos de linhas."""
+    if df.empty:
+        yield df.to_csv(index=False)
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start : start + chunk_rows].to_csv(index=False, header=start == 0)
+
+
+def write_csv(df, fh, compress=False, chunk_rows=CHUNK_ROWS):
+    """Escreve o df como CSV UTF-8 no arquivo binário fh."""
+    if compress:
+        # mtime=0: mesmo conteúdo gera os mesmos bytes
+        with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz:
+            write_csv(df, gz, chunk_rows=chunk_rows)
+        return
+    for chunk in iter_csv_chunks(df, chunk_rows):
+        fh.write(chunk.encode("utf-8"))
+
+
+def csv_bytes(df, compress=False, chunk_rows=CHUNK_ROWS):
+    buf = io.BytesIO()
+    write_csv(df, buf, compress=compress, chunk_rows=chunk_rows)
+    return buf.getvalue()
+
+
+def _xlsx_rows(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start : start + chunk_rows].astype(object)
+        # NaN / pd.NA / NaT viram células vazias
+        block = block.where(block.notna(), None)
+        yield from block.itertuples(index=False, name=None)
+
+
+def write_xlsx(sheets, fh, chunk_rows=CHUNK_ROWS):
+    """
+    Escreve um .xlsx com uma aba por item de sheets ({nome_da_aba: df}),
+    em modo write-only.
+    """
+    wb = Workbook(write_only=True)
+    for name, df in sheets.items():
+        ws = wb.create_sheet(title=name)
+        ws.append([str(c) for c in df.columns])
+        for row in _xlsx_rows(df, chunk_rows):
+            ws.append(row)
+    wb.save(fh)
+
+
+def xlsx_bytes(sheets, chunk_rows=CHUNK_ROWS):
+    buf = io.BytesIO()
+    write_xlsx(sheets, buf, chunk_rows=chunk_rows)
+    return buf.getvalue()
+
+
+class ExportCache:
+    """
+    Exportações já geradas, por chave (tipo de exportação + estado dos
+    filtros), com descarte LRU além de max_entries.
+
+    deferred(key, build) devolve uma função sem argumentos para o data= do
+    st.download_button: o arquivo só é gerado quando alguém clica, e o
+    Streamlit a chama em outra thread, daí o lock.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            data = build()
+            self._items[key] = data
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+            return data
+
+    def deferred(self, key, build):
+        return lambda: self.get(key, build)
+
+
+def download_button(container, label, data, **kwargs):
+    """
+    st.download_button com data adiado (callable). Versões do Streamlit que
+    não aceitam callable recebem os bytes já gerados.
+    """
+    from streamlit.errors import StreamlitAPIException
+
+    try:
+        return container.download_button(label, data=data, **kwargs)
+    except StreamlitAPIException:
+        return container.download_button(label, data=data(), **kwargs)
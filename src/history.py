@@ -0,0 +1,342 @@
+# src/history.py
+"""
+Índice persistente de devedores entre lotes (detecção de reincidência).
+
+DebtorIndex guarda, para cada devedor_documento já visto, os protocolos em
+que apareceu e o primeiro / último lote, num .npz compacto:
+  - keys: documentos como int64 ordenados (valor * 100 + nº de dígitos, para
+    não confundir zeros à esquerda), com first / last (id do lote) ao lado;
+  - offsets + prot_ids: os ids dos protocolos de cada documento (CSR);
+  - os textos dos protocolos e dos lotes em UTF-8 + offsets;
+  - um filtro de Bloom sobre keys, que descarta de cara a maioria dos
+    documentos novos numa consulta.
+
+Uma consulta de um lote é vetorizada (fatoração dos documentos, Bloom,
+np.searchsorted). add_batch funde um lote novo ao índice existente sem
+reprocessar os lotes anteriores.
+
+Só entram documentos só com dígitos e até 16 dígitos (CPF, CNPJ e
+variantes com dígito errado); os demais são ignorados.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.metrics import stripped_text
+
+MAX_DIGITS = 16
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+LOOKUP_COLUMNS = (
+    "devedor_documento",
+    "primeiro_lote",
+    "ultimo_lote",
+    "qtd_protocolos_anteriores",
+    "protocolos_anteriores",
+)
+
+
+def document_keys(docs):
+    """
+    Chaves int64 dos documentos (valor * 100 + nº de dígitos); -1 para
+    nulos e documentos que não são só dígitos (ou têm mais de MAX_DIGITS).
+    """
+    codes, uniques = pd.factorize(np.asarray(docs, dtype=object))
+    arr = pa.array(uniques, type=pa.string())
+    ok = pc.match_substring_regex(arr, r"^\d{1,%d}$" % MAX_DIGITS).fill_null(False)
+    digits = arr.filter(ok)
+    ukeys = np.full(len(arr) + 1, -1, dtype=np.int64)  # a última: código -1
+    ukeys[:-1][ok.to_numpy(zero_copy_only=False)] = (
+        pc.cast(digits, pa.int64()).to_numpy() * 100 + pc.utf8_length(digits).to_numpy()
+    )
+    return ukeys[codes]
+
+
+def batch_key(digests):
+    """
+    Chave de um lote a partir dos hashes de conteúdo (src.cache.content_hash)
+    dos seus arquivos: a mesma para os mesmos arquivos, em qualquer ordem.
+    """
+    h = hashlib.sha256()
+    for digest in sorted(digests):
+        h.update(digest.encode())
+    return h.hexdigest()
+
+
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bloom_positions(keys, n_bits):
+    """(len(keys), BLOOM_HASHES) posições de bit (hashing duplo)."""
+    with np.errstate(over="ignore"):
+        h1 = _splitmix64(keys.astype(np.uint64))
+        h2 = _splitmix64(h1) | np.uint64(1)
+        i = np.arange(BLOOM_HASHES, dtype=np.uint64)
+        pos = h1[:, None] + i * h2[:, None]
+    return pos & np.uint64(n_bits - 1)  # n_bits é potência de 2
+
+
+def build_bloom(keys):
+    n_bits = 1 << max(6, int(len(keys) * BLOOM_BITS_PER_KEY - 1).bit_length())
+    bits = np.zeros(n_bits // 8, dtype=np.uint8)
+    pos = _bloom_positions(keys, n_bits).ravel()
+    bit = np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)
+    np.bitwise_or.at(bits, (pos >> np.uint64(3)).astype(np.int64), bit)
+    return bits
+
+
+def bloom_may_contain(bits, keys):
+    n_bits = len(bits) * 8
+    pos = _bloom_positions(keys, n_bits)
+    byte = bits[(pos >> np.uint64(3)).astype(np.int64)]
+    return (
+        ((byte >> (pos & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1).astype(bool)
+    )
+
+
+def _pack_strings(values):
+    """(bytes UTF-8 concatenados como uint8, offsets int64)."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(raw, offsets, idx=None):
+    idx = range(len(offsets) - 1) if idx is None else idx
+    return [raw[offsets[i] : offsets[i + 1]].decode("utf-8") for i in idx]
+
+
+class DebtorIndex:
+    """
+    Índice devedor_documento -> (protocolos, primeiro/último lote) de todos
+    os lotes já registrados (ver o docstring do módulo).
+
+    DebtorIndex.load(path) abre o índice salvo (ou um vazio, se o arquivo
+    não existir); save grava de forma atômica. Cada lote tem um rótulo
+    (texto livre, ex.: a data) e uma chave única (ex.: hash do conteúdo);
+    registrar duas vezes a mesma chave é erro.
+    """
+
+    def __init__(self):
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.first = np.zeros(0, dtype=np.int32)
+        self.last = np.zeros(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.prot_ids = np.zeros(0, dtype=np.int32)
+        # textos dos protocolos: pd.Index, ou ainda em UTF-8 (bytes, offsets)
+        # logo depois do load, decodificados só se preciso
+        self._protocolos = pd.Index([], dtype=object)
+        self._protocol_blob = None
+        self.batch_labels = []
+        self.batch_keys = []
+        self.batch_times = np.zeros(0, dtype=np.float64)
+        self.bloom = build_bloom(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            index.keys = data["keys"]
+            index.first = data["first"]
+            index.last = data["last"]
+            index.offsets = data["offsets"]
+            index.prot_ids = data["prot_ids"]
+            index.bloom = data["bloom"]
+            index.batch_times = data["batch_times"]
+            index._protocolos = None
+            index._protocol_blob = (
+                data["prot_data"].tobytes(),
+                data["prot_offsets"],
+            )
+            index.batch_labels = _unpack_strings(
+                data["label_data"].tobytes(), data["label_offsets"]
+            )
+            index.batch_keys = _unpack_strings(
+                data["key_data"].tobytes(), data["key_offsets"]
+            )
+        return index
+
+    def _protocol_index(self):
+        if self._protocolos is None:
+            raw, offsets = self._protocol_blob
+            self._protocolos = pd.Index(_unpack_strings(raw, offsets), dtype=object)
+            self._protocol_blob = None
+        return self._protocolos
+
+    def _protocol_texts(self, ids):
+        if self._protocolos is None:
+            return _unpack_strings(*self._protocol_blob, ids)
+        return self._protocolos[ids].tolist()
+
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        prot_data, prot_offsets = _pack_strings(self._protocol_index())
+        label_data, label_offsets = _pack_strings(self.batch_labels)
+        key_data, key_offsets = _pack_strings(self.batch_keys)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npz")
+        os.close(fd)
+        try:
+            np.savez(
+                tmp,
+                keys=self.keys,
+                first=self.first,
+                last=self.last,
+                offsets=self.offsets,
+                prot_ids=self.prot_ids,
+                bloom=self.bloom,
+                batch_times=self.batch_times,
+                prot_data=prot_data,
+                prot_offsets=prot_offsets,
+                label_data=label_data,
+                label_offsets=label_offsets,
+                key_data=key_data,
+                key_offsets=key_offsets,
+            )
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def has_batch(self, key):
+        return key in self.batch_keys
+
+    def add_batch(self, label, docs, protocolos, key=None):
+        """
+        Registra um lote: docs e protocolos são colunas do mesmo tamanho
+        (devedor_documento e protocolo dos registros). Documentos sem
+        protocolo também contam como vistos. Retorna o id do lote.
+        """
+        key = label if key is None else key
+        if self.has_batch(key):
+            raise ValueError(f"lote já registrado: {key}")
+        batch = len(self.batch_keys)
+        keys = document_keys(docs)
+        prot_txt, prot_valid = stripped_text(pd.Series(protocolos, dtype=object))
+        valid = keys >= 0
+
+        # ids dos protocolos (novos vão para o fim do dicionário)
+        known = self._protocol_index()
+        pair_keys = keys[valid & prot_valid]
+        pair_txt = prot_txt[valid & prot_valid]
+        new_txt = pd.Index(pd.unique(pair_txt), dtype=object).difference(
+            known, sort=False
+        )
+        self._protocolos = known.append(new_txt) if len(new_txt) else known
+        pair_ids = self._protocolos.get_indexer(pair_txt).astype(np.int32)
+
+        # documentos: primeiro / último lote
+        new_keys = np.unique(keys[valid])
+        all_keys = np.union1d(self.keys, new_keys)
+        first = np.full(len(all_keys), batch, dtype=np.int32)
+        last = np.full(len(all_keys), batch, dtype=np.int32)
+        old_pos = np.searchsorted(all_keys, self.keys)
+        first[old_pos] = self.first
+        last[old_pos] = self.last
+        last[np.searchsorted(all_keys, new_keys)] = batch
+
+        # pares (documento, protocolo) únicos, ordenados por documento
+        old_pair_keys = np.repeat(self.keys, np.diff(self.offsets))
+        pk = np.concatenate([old_pair_keys, pair_keys])
+        pi = np.concatenate([self.prot_ids, pair_ids])
+        order = np.lexsort((pi, pk))
+        pk, pi = pk[order], pi[order]
+        keep = np.ones(len(pk), dtype=bool)
+        keep[1:] = (pk[1:] != pk[:-1]) | (pi[1:] != pi[:-1])
+        pk, pi = pk[keep], pi[keep]
+
+        self.keys = all_keys
+        self.first, self.last = first, last
+        self.offsets = np.searchsorted(pk, all_keys, side="left").astype(np.int64)
+        self.offsets = np.append(self.offsets, len(pk))
+        self.prot_ids = pi
+        self.bloom = build_bloom(all_keys)
+        self.batch_labels.append(label)
+        self.batch_keys.append(key)
+        self.batch_times = np.append(self.batch_times, time.time())
+        return batch
+
+    def _positions(self, keys, before=None):
+        """Posição em self.keys de cada chave (-1 se não vista)."""
+        pos = np.full(len(keys), -1, dtype=np.int64)
+        cand = np.flatnonzero(keys >= 0)
+        if not len(self.keys) or not len(cand):
+            return pos
+        cand = cand[bloom_may_contain(self.bloom, keys[cand])]
+        at = np.searchsorted(self.keys, keys[cand])
+        at[at == len(self.keys)] = 0
+        hit = self.keys[at] == keys[cand]
+        if before is not None:
+            hit &= self.first[at] < before
+        pos[cand[hit]] = at[hit]
+        return pos
+
+    def _batch_id(self, key):
+        return None if key is None else self.batch_keys.index(key)
+
+    def seen(self, docs, before=None):
+        """
+        Máscara (um bool por valor de docs) dos documentos já vistos.
+        before: chave de um lote; só contam os vistos antes dele.
+        """
+        return self._positions(document_keys(docs), self._batch_id(before)) >= 0
+
+    def lookup(self, docs, before=None):
+        """
+        Os documentos distintos de docs já vistos (ver seen), ordenados, com
+        primeiro / último lote (rótulos) e os protocolos conhecidos
+        (ordenados, separados por ", "). Colunas em LOOKUP_COLUMNS.
+        Com before, o filtro é pelo primeiro lote, mas último lote e
+        protocolos são os do índice inteiro (incluindo lotes posteriores).
+        """
+        docs = pd.unique(np.asarray(docs, dtype=object))
+        pos = self._positions(document_keys(docs), self._batch_id(before))
+        found = np.flatnonzero(pos >= 0)
+        at = pos[found]
+        protocolos = []
+        for p in at:
+            ids = self.prot_ids[self.offsets[p] : self.offsets[p + 1]]
+            protocolos.append(sorted(self._protocol_texts(ids)))
+        labels = np.asarray(self.batch_labels, dtype=object)
+        out = pd.DataFrame(
+            {
+                "devedor_documento": pd.Series(docs[found], dtype=object),
+                "primeiro_lote": labels[self.first[at]] if len(at) else [],
+                "ultimo_lote": labels[self.last[at]] if len(at) else [],
+                "qtd_protocolos_anteriores": pd.Series(
+                    [len(p) for p in protocolos], dtype="int64"
+                ),
+                "protocolos_anteriores": pd.Series(
+                    [", ".join(p) for p in protocolos], dtype=object
+                ),
+            }
+        )
+        return out.sort_values("devedor_documento", ignore_index=True)
+
+    def batches(self):
+        """Lotes registrados: rótulo, chave, data de registro e documentos novos."""
+        new_docs = np.bincount(self.first, minlength=len(self.batch_keys))
+        return pd.DataFrame(
+            {
+                "lote": self.batch_labels,
+                "chave": self.batch_keys,
+                "registrado_em": pd.to_datetime(self.batch_times, unit="s"),
+                "documentos_novos": new_docs[: len(self.batch_keys)],
+            }
+        )
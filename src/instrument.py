@@ -0,0 +1,260 @@
+# src/instrument.py
+"""
+Instrumentação leve das etapas do pipeline (parse, montagem do DataFrame,
+title_key, métricas, gráficos, renderização).
+
+O código das etapas abre `with stage("nome", rows=n):` (ou é decorado com
+@timed); sem um Recorder
+ativo (Recorder.activate) isso não grava nada. Cada etapa vira um evento
+com tempo de parede, linhas/s e pico de memória, que é:
+  - guardado no Recorder (frame / summary, para o painel do app);
+  - emitido como uma linha JSON no logger "xml_utils.perf" (configure_logging
+    liga a saída via XML_UTILS_PERF_LOG);
+  - resumido por etapa num arquivo texto do Prometheus (write_prometheus,
+    caminho em XML_UTILS_PROM_FILE), para o textfile collector do
+    node_exporter.
+
+Pico de memória: com tracemalloc ligado (XML_UTILS_TRACEMALLOC=1, que tem
+custo) é o pico de memória Python alocada durante a etapa; sem ele, o pico
+de RSS do processo até o fim da etapa.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+logger = logging.getLogger("xml_utils.perf")
+
+EVENT_FIELDS = ("stage", "file", "seconds", "rows", "rows_per_s", "peak_bytes")
+SUMMARY_COLUMNS = ("etapa", "chamadas", "segundos", "linhas", "linhas_por_s", "pico_mb")
+
+_active = contextvars.ContextVar("xml_utils_recorder", default=None)
+
+
+def _rss_peak_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def make_event(stage, seconds, rows=None, file=None, peak_bytes=None):
+    return {
+        "stage": stage,
+        "file": file,
+        "seconds": seconds,
+        "rows": rows,
+        "rows_per_s": rows / seconds if rows is not None and seconds > 0 else None,
+        "peak_bytes": peak_bytes,
+    }
+
+
+class Recorder:
+    """
+    Eventos de etapa de uma execução (ver o docstring do módulo).
+
+    activate() torna o Recorder o destino de stage()/record() no contexto
+    atual (thread / contextvars). Etapas podem ser aninhadas; o pico de
+    memória de uma etapa inclui o das etapas internas.
+    """
+
+    def __init__(self, events=None):
+        self.events = list(events or [])
+        self._lock = threading.Lock()
+        self._peaks = threading.local()
+
+    @contextmanager
+    def activate(self):
+        if (
+            os.environ.get("XML_UTILS_TRACEMALLOC") == "1"
+            and not tracemalloc.is_tracing()
+        ):
+            tracemalloc.start()
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def add(self, event):
+        with self._lock:
+            self.events.append(event)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"ts": time.time(), **event}, ensure_ascii=False))
+
+    @contextmanager
+    def stage(self, name, rows=None, file=None):
+        stack = self._peaks.__dict__.setdefault("stack", [])
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # o pico até aqui pertence à etapa de fora
+            if stack:
+                stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = stack.pop()
+            if tracing:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1] = max(stack[-1], peak)
+            else:
+                peak = _rss_peak_bytes()
+            self.add(make_event(name, seconds, rows, file, peak))
+
+    def frame(self):
+        """Um evento por linha (colunas de EVENT_FIELDS)."""
+        with self._lock:
+            events = list(self.events)
+        return pd.DataFrame(events, columns=list(EVENT_FIELDS))
+
+    def summary(self):
+        """
+        Totais por etapa, na ordem da primeira ocorrência: chamadas,
+        segundos, linhas, linhas/s e o maior pico de memória (MB).
+        """
+        df = self.frame()
+        if df.empty:
+            return pd.DataFrame(columns=list(SUMMARY_COLUMNS))
+        g = df.groupby("stage", sort=False)
+        out = pd.DataFrame(
+            {
+                "chamadas": g.size(),
+                "segundos": g["seconds"].sum(),
+                "linhas": g["rows"].sum(min_count=1),
+                "pico_mb": g["peak_bytes"].max() / (1024 * 1024),
+            }
+        )
+        out["linhas_por_s"] = out["linhas"] / out["segundos"].where(out["segundos"] > 0)
+        out = out.rename_axis("etapa").reset_index()
+        return out[list(SUMMARY_COLUMNS)]
+
+
+@contextmanager
+def stage(name, rows=None, file=None):
+    """Mede o bloco como a etapa `name` no Recorder ativo (nada, se não houver)."""
+    rec = _active.get()
+    if rec is None:
+        yield
+        return
+    with rec.stage(name, rows=rows, file=file):
+        yield
+
+
+def timed(name, rows=None):
+    """
+    Decorador: cada chamada da função é a etapa `name` (ver stage). rows,
+    se dado, calcula o número de linhas a partir do 1º argumento (ex.: len).
+    """
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active.get() is None:
+                return func(*args, **kwargs)
+            n = rows(args[0]) if rows is not None and args else None
+            with stage(name, rows=n):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record(name, seconds, rows=None, file=None):
+    """Grava uma etapa já medida (ex.: parse feito em outro processo)."""
+    rec = _active.get()
+    if rec is not None:
+        rec.add(make_event(name, seconds, rows, file))
+
+
+def configure_logging(target=None):
+    """
+    Liga a saída dos eventos JSON (uma linha por evento) em target ou, se
+    omitido, em XML_UTILS_PERF_LOG: "-" para stderr ou um caminho de arquivo.
+    Sem destino não faz nada. Pode ser chamada várias vezes.
+    """
+    target = target or os.environ.get("XML_UTILS_PERF_LOG")
+    if not target or getattr(logger, "_xml_utils_target", None) == target:
+        return
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+        h.close()
+    handler = (
+        logging.StreamHandler(sys.stderr)
+        if target == "-"
+        else logging.FileHandler(target, encoding="utf-8")
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger._xml_utils_target = target
+
+
+def _prom_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(recorder, prefix="xml_utils"):
+    """Resumo por etapa (Recorder.summary) no formato texto do Prometheus."""
+    summary = recorder.summary()
+    gauges = (
+        ("stage_seconds", "segundos", "Tempo de parede somado da etapa."),
+        ("stage_calls", "chamadas", "Número de execuções da etapa."),
+        ("stage_rows", "linhas", "Linhas processadas na etapa."),
+        ("stage_rows_per_second", "linhas_por_s", "Vazão da etapa (linhas/s)."),
+        ("stage_peak_bytes", "pico_mb", "Maior pico de memória na etapa (bytes)."),
+    )
+    lines = []
+    for metric, column, help_text in gauges:
+        name = f"{prefix}_{metric}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for row in summary.itertuples(index=False):
+            value = getattr(row, column)
+            if pd.isna(value):
+                continue
+            if column == "pico_mb":
+                value = value * 1024 * 1024
+            lines.append(
+                f'{name}{{stage="{_prom_label(row.etapa)}"}} {float(value):.6g}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(recorder, path=None):
+    """
+    Grava prometheus_text em path (padrão: XML_UTILS_PROM_FILE; sem caminho
+    não faz nada). Escreve num temporário e renomeia, para o collector
+    nunca ler um arquivo pela metade.
+    """
+    path = path or os.environ.get("XML_UTILS_PROM_FILE")
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(prometheus_text(recorder))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,107 @@
+# src/jobs.py
+"""
+Parse em segundo plano para o app.
+
+ParseJob roda IncrementalDataset.add_files numa thread própria e guarda o
+progresso (arquivos prontos, registros, erros), para a interface acompanhar
+sem bloquear: o dataset recebe cada arquivo assim que ele é parseado, então
+as métricas parciais já podem ser lidas durante o job.
+"""
+
+import io
+import threading
+import time
+
+from src.archive import expand_archives
+from src.parser import source_names
+
+PENDING = "pendente"
+DONE = "ok"
+FAILED = "erro"
+
+
+def detach(f):
+    """
+    Cópia em memória de um upload (BytesIO com o mesmo name), que a thread
+    pode ler sem depender do objeto do rerun que a criou.
+    """
+    if not hasattr(f, "getvalue"):
+        return f
+    buf = io.BytesIO(f.getvalue())
+    buf.name = f.name
+    return buf
+
+
+class ParseJob:
+    """
+    Um add_files do dataset em uma thread daemon (start() dispara).
+
+    files: status por arquivo (nome -> PENDING / DONE / FAILED), na ordem;
+    records: registros extraídos até agora; errors: erros de parse;
+    exception: exceção que interrompeu o job (None se não houve).
+    recorder, se dado, recebe as etapas do parse (src.instrument).
+    """
+
+    def __init__(self, dataset, files, recorder=None):
+        self.dataset = dataset
+        self.recorder = recorder
+        self._inputs = [detach(f) for f in files]
+        self.files = {}
+        self.records = 0
+        self.errors = []
+        self.exception = None
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.time()
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def total(self):
+        with self._lock:
+            return len(self.files)
+
+    @property
+    def done(self):
+        with self._lock:
+            return sum(s != PENDING for s in self.files.values())
+
+    def status(self):
+        """Cópia de files (nome -> status), segura para ler durante o job."""
+        with self._lock:
+            return dict(self.files)
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return not self.running
+
+    def _on_result(self, name, n_records, err):
+        with self._lock:
+            self.files[name] = DONE if err is None else FAILED
+            self.records += n_records
+            if err is not None:
+                self.errors.append(err)
+
+    def _run(self):
+        try:
+            files = list(expand_archives(self._inputs))
+            with self._lock:
+                self.files = {source_names(f)[0]: PENDING for f in files}
+            if self.recorder is None:
+                self.dataset.add_files(files, on_result=self._on_result)
+            else:
+                with self.recorder.activate():
+                    self.dataset.add_files(files, on_result=self._on_result)
+        except Exception as e:
+            self.exception = e
+        finally:
+            self._inputs = None
+            self.finished = time.time()
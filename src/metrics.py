@@ -1,71 +1,139 @@
 # src/metrics.py
+import numpy as np
 import pandas as pd
 
+from src.instrument import timed
+from src.parser import phones_frame
+
+MULTI_COLUMNS = ["devedor_documento", "qtd_protocolos_unicos", "protocolos_unicos"]
+REQUIRED_COLUMNS = [
+    "title_key",
+    "protocolo",
+    "devedor_documento",
+    "devedor_tipo",
+    "telefone",
+    "valor_centavos",
+]
+FLAG_COLUMNS = ["has_phone", "has_cpf", "has_cnpj", "has_mobile"]
+
 
 def compute_all_metrics(df):
     """
     Recebe dataframe do parser e retorna dict com métricas e tabelas prontas.
     """
     # safety: ensure columns exist
-    required = [
-        "title_key",
-        "protocolo",
-        "devedor_documento",
-        "devedor_tipo",
-        "telefone",
-    ]
-    for c in required:
+    for c in REQUIRED_COLUMNS:
         if c not in df.columns:
             df[c] = None
 
-    grouped = df.groupby("title_key")
-
-    total_titulos = df["title_key"].nunique()
-    titles_with_phone = int(
-        grouped["telefone"]
-        .apply(
-            lambda s: s.dropna()
-            .astype(str)
-            .str.strip()
-            .replace("", pd.NA)
-            .notna()
-            .any()
-        )
-        .sum()
-    )
-    has_cpf_by_title = grouped["devedor_tipo"].apply(lambda s: s.eq("CPF").any())
-    has_cnpj_by_title = grouped["devedor_tipo"].apply(lambda s: s.eq("CNPJ").any())
+    return metrics_from_partials(metric_partials(df))
 
-    titles_with_cpf = int(has_cpf_by_title.sum())
-    titles_with_cnpj = int(has_cnpj_by_title.sum())
-    titles_with_both = int(((has_cpf_by_title) & (has_cnpj_by_title)).sum())
 
-    # unique cpfs / cnpjs
-    unique_cpfs = (
-        df.loc[df["devedor_tipo"] == "CPF", "devedor_documento"].dropna().unique()
-    )
-    unique_cnpjs = (
-        df.loc[df["devedor_tipo"] == "CNPJ", "devedor_documento"].dropna().unique()
+@timed("metric_partials", rows=len)
+def metric_partials(df):
+    """
+    Agregados parciais e mescláveis de um dataframe do parser:
+      - titles: flags por título (ver title_flags)
+      - doc_protocols: pares únicos (devedor_documento, protocolo), com
+        protocolo já sem espaços e sem vazios
+      - doc_tipos: pares únicos (devedor_documento, devedor_tipo)
+      - phones: hashes (uint64, ordenados e únicos) dos telefones
+        normalizados das linhas (ver phone_hashes)
+
+    Partials de frames diferentes combinam com merge_partials, e
+    metrics_from_partials do resultado é igual a compute_all_metrics do
+    frame concatenado.
+    """
+    df_docs = df[df["devedor_documento"].notna()]
+    prot_txt, valid = stripped_text(df_docs["protocolo"])
+    doc_protocols = pd.DataFrame(
+        {
+            "devedor_documento": df_docs["devedor_documento"].to_numpy()[valid],
+            "protocolo": prot_txt[valid],
+        }
+    ).drop_duplicates()
+    doc_tipos = (
+        df_docs[["devedor_documento", "devedor_tipo"]]
+        .drop_duplicates()
+        .reset_index(drop=True)
     )
-    qtd_cpfs_unicos = unique_cpfs.shape[0]
-    qtd_cnpjs_unicos = unique_cnpjs.shape[0]
-    unique_devedores_total = pd.Series(df["devedor_documento"].dropna().unique()).shape[
-        0
-    ]
+    phones = phones_frame(df)
+    return {
+        "titles": title_flags(df, phones),
+        "doc_protocols": doc_protocols.reset_index(drop=True),
+        "doc_tipos": doc_tipos,
+        "phones": phone_hashes(phones),
+    }
+
+
+def merge_partials(parts):
+    """Combina uma lista de metric_partials num único partial."""
+    parts = list(parts)
+    if not parts:
+        return metric_partials(pd.DataFrame(columns=REQUIRED_COLUMNS))
+    titles = pd.concat([p["titles"] for p in parts])
+    return {
+        "titles": _aggregate_titles(titles.groupby(level=0)),
+        "doc_protocols": pd.concat([p["doc_protocols"] for p in parts])
+        .drop_duplicates()
+        .reset_index(drop=True),
+        "doc_tipos": pd.concat([p["doc_tipos"] for p in parts])
+        .drop_duplicates()
+        .reset_index(drop=True),
+        "phones": np.unique(np.concatenate([p["phones"] for p in parts])),
+    }
+
 
-    # multi-protocolos por tipo
-    df_cpf_multi, cpf_multi_count = protocols_multi_by_type(df, tipo="CPF")
-    df_cnpj_multi, cnpj_multi_count = protocols_multi_by_type(df, tipo="CNPJ")
+@timed("metrics", rows=lambda p: len(p["titles"]))
+def metrics_from_partials(partials):
+    """Dict de métricas (mesmo formato de compute_all_metrics) a partir de partials."""
+    flags = partials["titles"]
+    total_titulos = len(flags)
+    titles_with_phone = int(flags["has_phone"].sum())
+    titles_with_cpf = int(flags["has_cpf"].sum())
+    titles_with_cnpj = int(flags["has_cnpj"].sum())
+    titles_with_both = int((flags["has_cpf"] & flags["has_cnpj"]).sum())
+    titles_with_mobile = int(flags["has_mobile"].sum())
 
+    # valores protestados (um por título), em centavos
+    has_valor = flags["valor_centavos"].notna().to_numpy()
+    cents = flags["valor_centavos"].to_numpy(dtype=np.int64, na_value=0)
+    titles_with_valor = int(has_valor.sum())
+    valor_total = int(cents.sum())
+    valor_cpf = int(cents[flags["has_cpf"].to_numpy(dtype=bool)].sum())
+    valor_cnpj = int(cents[flags["has_cnpj"].to_numpy(dtype=bool)].sum())
+
+    # unique cpfs / cnpjs
+    doc_tipos = partials["doc_tipos"]
+    tipo = doc_tipos["devedor_tipo"]
+    qtd_cpfs_unicos = doc_tipos.loc[tipo == "CPF", "devedor_documento"].nunique()
+    qtd_cnpjs_unicos = doc_tipos.loc[tipo == "CNPJ", "devedor_documento"].nunique()
+    unique_devedores_total = doc_tipos["devedor_documento"].nunique()
+
+    # multi-protocolos por tipo (agregação por documento feita uma só vez)
+    summary = _multi_summary(
+        partials["doc_protocols"], doc_tipos, tipos=("CPF", "CNPJ")
+    )
+    df_cpf_multi, cpf_multi_count = select_multi_by_type(summary, "CPF")
+    df_cnpj_multi, cnpj_multi_count = select_multi_by_type(summary, "CNPJ")
     return {
         "total_titulos": int(total_titulos),
         "titles_with_phone": int(titles_with_phone),
         "titles_with_cpf": int(titles_with_cpf),
         "titles_with_cnpj": int(titles_with_cnpj),
         "titles_with_both": int(titles_with_both),
+        "titles_with_valid_mobile": titles_with_mobile,
+        "unique_phones": len(partials["phones"]),
         "qtd_cpfs_unicos": int(qtd_cpfs_unicos),
         "qtd_cnpjs_unicos": int(qtd_cnpjs_unicos),
         "unique_devedores_total": int(unique_devedores_total),
+        "titles_with_valor": titles_with_valor,
+        "valor_total_centavos": valor_total,
+        "valor_medio_centavos": (
+            valor_total / titles_with_valor if titles_with_valor else 0.0
+        ),
+        "valor_cpf_centavos": valor_cpf,
+        "valor_cnpj_centavos": valor_cnpj,
         "df_cpf_multi": df_cpf_multi,
         "df_cnpj_multi": df_cnpj_multi,
         "cpf_multi_count": int(cpf_multi_count),
@@ -73,48 +141,117 @@ def compute_all_metrics(df):
     }
 
 
-def protocols_multi_by_type(df, tipo="CPF"):
+def stripped_text(s):
     """
-    Retorna (df_multi, count) onde df_multi é dataframe com documentos do tipo
-    especificado que possuem mais de 1 protocolo único.
+    (texto, válido) de uma coluna: str(x).strip() como array e máscara de
+    valores não nulos e não vazios. As operações de string rodam só sobre os
+    valores distintos (pd.factorize), pois as colunas são muito repetitivas.
+    """
+    codes, uniques = pd.factorize(s)
+    # sentinela "" no fim: o código -1 (nulo) cai nela
+    text = np.append(pd.Index(uniques, dtype=object).astype(str).str.strip(), "")
+    values = text[codes]
+    return values, values != ""
+
+
+def phone_hashes(phones):
+    """
+    Hashes distintos (uint64, ordenados) da coluna telefone de uma tabela de
+    phones_frame: a contagem de telefones únicos e a união entre partials
+    ficam em NumPy, sem carregar os textos.
     """
-    # dropna docs
-    df_docs = df.dropna(subset=["devedor_documento"]).copy()
-    # group protocols per document
-    prot_by_doc = df_docs.groupby("devedor_documento")["protocolo"].apply(
-        lambda s: sorted(
-            {str(x).strip() for x in s.dropna().astype(str) if str(x).strip() != ""}
-        )
+    return np.unique(pd.util.hash_array(phones["telefone"].to_numpy(dtype=object)))
+
+
+def title_flags(df, phones=None):
+    """
+    DataFrame indexado por title_key com as colunas booleanas has_phone,
+    has_cpf, has_cnpj e has_mobile (algum celular válido entre os telefones
+    normalizados; True se alguma linha do título atende) e valor_centavos, o
+    valor protestado do título (Int64; o maior, se as linhas divergirem).
+    phones: phones_frame(df), se já calculada.
+    """
+    tipo = df["devedor_tipo"]
+    if phones is None:
+        phones = phones_frame(df)
+    has_mobile = np.zeros(len(df), dtype=bool)
+    has_mobile[phones["registro"].to_numpy()[phones["celular"].to_numpy()]] = True
+    if "valor_centavos" in df.columns:
+        valor = df["valor_centavos"].astype("Int64")
+    else:  # frames de antes das colunas tipadas
+        valor = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    rows = pd.DataFrame(
+        {
+            "title_key": df["title_key"],
+            "has_phone": stripped_text(df["telefone"])[1],
+            "has_cpf": tipo.eq("CPF"),
+            "has_cnpj": tipo.eq("CNPJ"),
+            "has_mobile": has_mobile,
+            "valor_centavos": valor,
+        }
     )
-    prot_counts = prot_by_doc.apply(len)
-    # types by doc
-    type_by_doc = df_docs.groupby("devedor_documento")["devedor_tipo"].apply(
-        lambda s: ",".join(sorted(set([str(x) for x in s.dropna() if str(x).strip()])))
+    return _aggregate_titles(rows.groupby("title_key"))
+
+
+def _aggregate_titles(grouped):
+    flags = grouped[FLAG_COLUMNS].any()
+    flags["valor_centavos"] = grouped["valor_centavos"].max()
+    return flags
+
+
+def multi_protocol_summary(df, tipos=("CPF", "CNPJ")):
+    """
+    Documentos com mais de 1 protocolo único, agregados uma única vez:
+    colunas de MULTI_COLUMNS mais uma coluna booleana por tipo em `tipos`
+    (True se alguma linha do documento tem exatamente esse devedor_tipo; um
+    CPF_INVALIDO não conta como CPF).
+    Ordenado por documento.
+    """
+    p = metric_partials(df)
+    return _multi_summary(p["doc_protocols"], p["doc_tipos"], tipos)
+
+
+def _multi_summary(doc_protocols, doc_tipos, tipos):
+    counts = doc_protocols.groupby("devedor_documento").size()
+    multi = counts[counts > 1]
+
+    summary = pd.DataFrame(
+        {"devedor_documento": multi.index, "qtd_protocolos_unicos": multi.values}
     )
-    multi = prot_counts[prot_counts > 1]
-    # filter by tipo
-    mask = type_by_doc.loc[multi.index].str.contains(tipo, na=False)
-    selected = multi[mask]
+    # lista ordenada de protocolos só para os documentos selecionados
+    multi_pairs = doc_protocols[
+        doc_protocols["devedor_documento"].isin(multi.index)
+    ].sort_values(["devedor_documento", "protocolo"])
+    joined = multi_pairs.groupby("devedor_documento")["protocolo"].agg(", ".join)
+    summary["protocolos_unicos"] = joined.reindex(multi.index).to_numpy()
+
+    tipo = doc_tipos["devedor_tipo"]
+    for t in tipos:
+        has = tipo.eq(t).groupby(doc_tipos["devedor_documento"]).any()
+        summary[t] = has.reindex(multi.index, fill_value=False).to_numpy()
+    return summary
+
+
+def select_multi_by_type(summary, tipo):
+    """
+    Recorta de multi_protocol_summary os documentos do tipo especificado.
+    Retorna (df_multi, count).
+    """
+    selected = summary[summary[tipo].astype(bool)]
     if selected.empty:
-        df_multi = pd.DataFrame(
-            columns=["devedor_documento", "qtd_protocolos_unicos", "protocolos_unicos"]
-        )
-        return df_multi, 0
-    df_multi = (
-        pd.DataFrame(
-            {
-                "devedor_documento": selected.index,
-                "qtd_protocolos_unicos": selected.values,
-                "protocolos_unicos": prot_by_doc.loc[selected.index].apply(
-                    lambda lst: ", ".join(lst)
-                ),
-            }
-        )
-        .reset_index(drop=True)       
-    )
+        return pd.DataFrame(columns=MULTI_COLUMNS), 0
+    df_multi = selected[MULTI_COLUMNS].reset_index(drop=True)
     return df_multi, df_multi.shape[0]
 
 
+def protocols_multi_by_type(df, tipo="CPF"):
+    """
+    Retorna (df_multi, count) onde df_multi é dataframe com documentos do tipo
+    especificado que possuem mais de 1 protocolo único.
+    """
+    return select_multi_by_type(multi_protocol_summary(df, tipos=(tipo,)), tipo)
+
+
 def make_cpf_cnpj_lists(df):
     cpfs = sorted(
         df.loc[df["devedor_tipo"] == "CPF", "devedor_documento"]
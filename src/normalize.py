@@ -0,0 +1,311 @@
+# src/normalize.py
+"""
+Normalização vetorizada de documentos, telefones, valores e datas.
+
+Roda sobre colunas inteiras (listas) em vez de registro a registro: os
+valores são fatorados (documentos e telefones se repetem muito), a limpeza
+de dígitos é feita com NumPy direto no buffer UTF-8 dos valores distintos e
+os dígitos verificadores de CPF/CNPJ (módulo 11) são conferidos numa matriz
+de dígitos.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# pesos do módulo 11 para o 1º e o 2º dígito verificador
+CPF_WEIGHTS = (np.arange(10, 1, -1), np.arange(11, 1, -1))
+CNPJ_WEIGHTS = (
+    np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]),
+    np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]),
+)
+# marcadores de documento mascarado (o tipo fica UNKNOWN)
+MASK_MARKERS = ("*", "MASCAR")
+
+
+def _factorize(values):
+    """(códigos, valores distintos como pa.string); nulos têm código -1."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return codes, pa.array(uniques, type=pa.string())
+
+
+def _expand(codes, values, fill):
+    """Valores por linha a partir dos valores distintos (código -1 -> fill)."""
+    out = np.empty(len(values) + 1, dtype=object)
+    out[:-1] = values
+    out[-1] = fill
+    return out[codes]
+
+
+def _only_digits(arr):
+    """
+    Só os dígitos ASCII de cada valor de arr (pa.string sem nulos), filtrando
+    os bytes do buffer de dados. Retorna (digitos, offsets, array): os bytes
+    dos dígitos concatenados, os offsets de cada valor neles (len(arr) + 1)
+    e o pa.string correspondente, com nulo onde não há dígito.
+    """
+    offsets = np.frombuffer(arr.buffers()[1], dtype=np.int32)
+    offsets = offsets[arr.offset : arr.offset + len(arr) + 1]
+    data = arr.buffers()[2]
+    data = (
+        np.frombuffer(data, dtype=np.uint8)
+        if data is not None
+        else np.zeros(0, np.uint8)
+    )
+    # bytes 0-9 nunca aparecem dentro de um caractere UTF-8 multibyte
+    is_digit = (data >= 48) & (data <= 57)
+    cum = np.concatenate(([0], np.cumsum(is_digit, dtype=np.int64)))
+    new_offsets = cum[offsets]
+    digits = data[is_digit]
+    counts = np.diff(new_offsets)
+    validity = np.packbits(counts > 0, bitorder="little")
+    out = pa.StringArray.from_buffers(
+        len(arr),
+        pa.py_buffer(new_offsets.astype(np.int32)),
+        pa.py_buffer(digits),
+        pa.py_buffer(validity),
+    )
+    return digits, new_offsets, out
+
+
+def digit_matrix(digits, starts, width):
+    """Matriz (n, width) de int64 com `width` dígitos a partir de cada início."""
+    return digits[starts[:, None] + np.arange(width)].astype(np.int64) - 48
+
+
+def _mod11(m, weights):
+    r = (m[:, : len(weights)] @ weights) % 11
+    return np.where(r < 2, 0, 11 - r)
+
+
+def valid_check_digits(m, weights):
+    """
+    Confere os dois dígitos verificadores (módulo 11) de cada linha da matriz
+    de dígitos. Sequências de um só dígito repetido são inválidas.
+    """
+    n = len(weights[0])
+    ok = (_mod11(m, weights[0]) == m[:, n]) & (_mod11(m, weights[1]) == m[:, n + 1])
+    return ok & (m != m[:, :1]).any(axis=1)
+
+
+def normalize_documents(raw):
+    """
+    Normaliza uma coluna de documentos brutos.
+
+    Retorna (documento, tipo, valido), arrays do tamanho de raw:
+      - documento: só os dígitos (o próprio valor, sem espaços, se não houver
+        dígitos; None se raw for nulo)
+      - tipo: CPF / CNPJ (11 / 14 dígitos, verificadores corretos),
+        CPF_INVALIDO / CNPJ_INVALIDO (verificadores errados) ou UNKNOWN
+        (ausente, mascarado ou outro tamanho)
+      - valido: True só para CPF e CNPJ
+    """
+    codes, arr = _factorize(raw)
+    digits, offsets, digit_arr = _only_digits(arr)
+    stripped = pc.utf8_trim_whitespace(arr)
+    documento = pc.if_else(
+        pc.is_null(digit_arr),
+        pc.if_else(pc.equal(stripped, ""), pa.scalar(None, pa.string()), stripped),
+        digit_arr,
+    ).to_numpy(zero_copy_only=False)
+
+    masked = pc.match_substring(arr, MASK_MARKERS[0])
+    for marker in MASK_MARKERS[1:]:
+        masked = pc.or_(masked, pc.match_substring(pc.utf8_upper(arr), marker))
+    masked = masked.to_numpy(zero_copy_only=False)
+    n_digits = np.diff(offsets)
+
+    tipo = np.full(len(arr), "UNKNOWN", dtype=object)
+    valido = np.zeros(len(arr), dtype=bool)
+    for width, name, weights in ((11, "CPF", CPF_WEIGHTS), (14, "CNPJ", CNPJ_WEIGHTS)):
+        idx = np.flatnonzero((n_digits == width) & ~masked)
+        if not len(idx):
+            continue
+        ok = valid_check_digits(digit_matrix(digits, offsets[idx], width), weights)
+        tipo[idx] = np.where(ok, name, name + "_INVALIDO")
+        valido[idx] = ok
+
+    return (
+        _expand(codes, documento, None),
+        _expand(codes, tipo, "UNKNOWN"),
+        _expand(codes, valido, False).astype(bool),
+    )
+
+
+def normalize_phones(raw):
+    """Só os dígitos de cada telefone (None se nulo ou sem dígitos)."""
+    codes, arr = _factorize(raw)
+    phones = _only_digits(arr)[2].to_numpy(zero_copy_only=False)
+    return _expand(codes, phones, None)
+
+
+# DDDs em uso no Brasil
+VALID_DDDS = frozenset(
+    (11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28)
+    + (31, 32, 33, 34, 35, 37, 38, 41, 42, 43, 44, 45, 46, 47, 48, 49)
+    + (51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 68, 69)
+    + (71, 73, 74, 75, 77, 79, 81, 82, 83, 84, 85, 86, 87, 88, 89)
+    + (91, 92, 93, 94, 95, 96, 97, 98, 99)
+)
+
+
+def normalize_phone_numbers(raw):
+    """
+    Normaliza telefones brasileiros para 55 + DDD + número (só dígitos).
+
+    Aceita o número com ou sem o código do país (55), com zero de longa
+    distância e código de operadora ("0 15 11 ..."). Um celular de 8
+    dígitos (começando com 6-9) ganha o 9 na frente; com 9 dígitos, o número
+    tem que começar com 9; um fixo tem 8 dígitos começando com 2-5. Números
+    sem DDD válido ou com outro tamanho são inválidos.
+
+    Retorna (telefone, celular), arrays do tamanho de raw: telefone None
+    onde é inválido; celular True para celulares válidos.
+    """
+    codes, arr = _factorize(raw)
+    digits, offsets, _ = _only_digits(arr)
+    if not len(digits):
+        return (
+            np.full(len(codes), None, dtype=object),
+            np.zeros(len(codes), dtype=bool),
+        )
+    n_digits = np.diff(offsets)
+    starts = offsets[:-1].copy()
+    first = np.where(n_digits > 0, digits[np.minimum(starts, len(digits) - 1)], 0)
+    # zero de longa distância (e código de operadora, se sobrar 12-13 dígitos)
+    trunk = (first == ord("0")) & (n_digits > 10)
+    starts += trunk
+    n_digits -= trunk
+    carrier = trunk & ((n_digits == 12) | (n_digits == 13))
+    starts += 2 * carrier
+    n_digits -= 2 * carrier
+    # código do país (só lê os dígitos de quem tem tamanho para tê-lo)
+    country = np.zeros(len(arr), dtype=bool)
+    cand = np.flatnonzero((n_digits == 12) | (n_digits == 13))
+    if len(cand):
+        lead = digit_matrix(digits, starts[cand], 2)
+        country[cand] = (lead[:, 0] == 5) & (lead[:, 1] == 5)
+    starts += 2 * country
+    n_digits -= 2 * country
+
+    ok = (n_digits == 10) | (n_digits == 11)
+    m = np.zeros((len(arr), 11), dtype=np.int64)
+    if ok.any():
+        idx = np.flatnonzero(ok)
+        m[idx, :10] = digit_matrix(digits, starts[idx], 10)
+        eleven = idx[n_digits[idx] == 11]
+        m[eleven, 10] = digits[starts[eleven] + 10] - 48
+    ddd = m[:, 0] * 10 + m[:, 1]
+    ok &= np.isin(ddd, list(VALID_DDDS))
+    lead = m[:, 2]
+    mobile = ok & (((n_digits == 11) & (lead == 9)) | ((n_digits == 10) & (lead >= 6)))
+    # fixo: 8 dígitos começando com 2-5
+    ok &= mobile | ((n_digits == 10) & (lead >= 2) & (lead <= 5))
+
+    # 55 + DDD + (9 +) número
+    number = np.where(
+        n_digits == 11,
+        np.sum(m[:, 2:11] * 10 ** np.arange(8, -1, -1), axis=1),
+        np.sum(m[:, 2:10] * 10 ** np.arange(7, -1, -1), axis=1)
+        + np.where(mobile, 900_000_000, 0),
+    )
+    width = np.where(mobile, 9, 8)
+    phone = np.full(len(arr), None, dtype=object)
+    for w in (8, 9):
+        sel = np.flatnonzero(ok & (width == w))
+        if len(sel):
+            phone[sel] = np.char.add(
+                np.char.add("55", np.char.zfill(ddd[sel].astype(str), 2)),
+                np.char.zfill(number[sel].astype(str), w),
+            ).astype(object)
+    return _expand(codes, phone, None), _expand(codes, mobile, False).astype(bool)
+
+
+# dd/mm/aaaa (também com - ou .) e aaaa-mm-dd, com hora opcional depois
+DATE_PATTERNS = (
+    r"^(?P<d>\d{1,2})[/.-](?P<m>\d{1,2})[/.-](?P<y>\d{4})(?:[T ].*)?$",
+    r"^(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})(?:[T ].*)?$",
+)
+AMOUNT_PATTERN = r"^(?P<s>-?)(?P<i>\d{1,15})(?:\.(?P<f>\d+))?$"
+
+
+def _int_field(parsed, name):
+    field = pc.struct_field(parsed, name)
+    out = pc.cast(pc.if_else(pc.equal(field, ""), "0", field), pa.int64())
+    return out.fill_null(0).to_numpy(zero_copy_only=False)
+
+
+def is_blank(raw):
+    """True onde o valor é nulo ou só tem espaços."""
+    codes, arr = _factorize(raw)
+    blank = pc.equal(pc.utf8_trim_whitespace(arr), "").to_numpy(zero_copy_only=False)
+    return _expand(codes, blank, True).astype(bool)
+
+
+def parse_amounts(raw):
+    """
+    Converte valores monetários em texto ("1.234,56", "R$ 1234,56",
+    "1234.56") para centavos.
+
+    Retorna (centavos, ok), arrays do tamanho de raw: centavos em int64
+    (0 onde não converteu) e ok, False para nulos e textos que não são um
+    valor. Vírgula é a separadora decimal; sem vírgula, o ponto só é de
+    milhar no formato "1.234.567". Casas além da 2ª são arredondadas.
+    """
+    codes, arr = _factorize(raw)
+    s = pc.replace_substring_regex(arr, r"(?i)r\$|\s", "")
+    comma = pc.match_substring(s, ",")
+    thousands = pc.match_substring_regex(s, r"^-?\d{1,3}(\.\d{3})+$")
+    s = pc.if_else(
+        pc.or_(comma, thousands),
+        pc.replace_substring(pc.replace_substring(s, ".", ""), ",", "."),
+        s,
+    )
+    parsed = pc.extract_regex(s, AMOUNT_PATTERN)
+    ok = parsed.is_valid().to_numpy(zero_copy_only=False)
+    frac = pc.utf8_rpad(pc.struct_field(parsed, "f").fill_null(""), 3, "0")
+    cents = _int_field(parsed, "i") * 100 + pc.cast(
+        pc.utf8_slice_codeunits(frac, 0, 2), pa.int64()
+    ).to_numpy(zero_copy_only=False)
+    cents += pc.utf8_slice_codeunits(frac, 2, 3).to_numpy(zero_copy_only=False) >= "5"
+    negative = pc.equal(pc.struct_field(parsed, "s"), "-").fill_null(False)
+    cents = np.where(negative.to_numpy(zero_copy_only=False), -cents, cents)
+    cents = np.where(ok, cents, 0)
+    return (
+        _expand(codes, cents, 0).astype(np.int64),
+        _expand(codes, ok, False).astype(bool),
+    )
+
+
+def parse_dates(raw):
+    """
+    Converte datas em texto (dd/mm/aaaa ou aaaa-mm-dd, hora ignorada) para
+    datetime64[ns].
+
+    Retorna (datas, ok): NaT onde não converteu; ok é False para nulos e
+    datas inexistentes (ex.: 31/02/2024).
+    """
+    codes, arr = _factorize(raw)
+    arr = pc.utf8_trim_whitespace(arr)
+    y = np.zeros(len(arr), dtype=np.int64)
+    m = np.zeros(len(arr), dtype=np.int64)
+    d = np.zeros(len(arr), dtype=np.int64)
+    matched = np.zeros(len(arr), dtype=bool)
+    for pattern in DATE_PATTERNS:
+        parsed = pc.extract_regex(arr, pattern)
+        hit = parsed.is_valid().to_numpy(zero_copy_only=False) & ~matched
+        y = np.where(hit, _int_field(parsed, "y"), y)
+        m = np.where(hit, _int_field(parsed, "m"), m)
+        d = np.where(hit, _int_field(parsed, "d"), d)
+        matched |= hit
+    ok = matched & (m >= 1) & (m <= 12) & (d >= 1) & (d <= 31)
+    month = np.where(ok, (y - 1970) * 12 + m - 1, 0).astype("datetime64[M]")
+    dates = month.astype("datetime64[D]") + np.where(ok, d - 1, 0)
+    # dia além do fim do mês cai no mês seguinte
+    ok &= dates.astype("datetime64[M]") == month
+    dates = np.where(ok, dates, np.datetime64("NaT")).astype("datetime64[ns]")
+    return (
+        _expand(codes, dates, np.datetime64("NaT")).astype("datetime64[ns]"),
+        _expand(codes, ok, False).astype(bool),
+    )
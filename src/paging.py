@@ -0,0 +1,91 @@
+# src/paging.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def page_count(n_rows, page_size):
+    """Número de páginas (pelo menos 1, para a tabela vazia)."""
+    return max(1, -(-n_rows // page_size))
+
+
+class TablePager:
+    """
+    Paginação da tabela analítica no servidor, montada uma vez por dataset.
+
+    rows(key, mask, sort_by, ascending) devolve as posições (no df) das
+    linhas do estado de filtro `key`, já ordenadas: mask é uma função sem
+    argumentos que devolve o array booleano do filtro e só é chamada quando
+    o estado ainda não está em cache. A ordenação de cada coluna é
+    calculada uma vez sobre o df inteiro (estável, nulos no fim); a de um
+    filtro sai dela, em O(n), sem ordenar de novo.
+
+    page(rows, page, page_size, columns) monta só a fatia visível, com as
+    colunas pedidas.
+
+    O pager fica no resultado memoizado do pipeline da sessão; o lock
+    protege os caches de reruns que se sobrepõem.
+    """
+
+    def __init__(self, df, cache_size=16):
+        self.df = df
+        self._orders = {}
+        self._masks = OrderedDict()
+        self._rows = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.RLock()
+
+    def order(self, column, ascending=True):
+        """Posições do df inteiro ordenadas por column."""
+        key = (column, ascending)
+        with self._lock:
+            if key not in self._orders:
+                values = self.df[column].reset_index(drop=True)
+                self._orders[key] = (
+                    values.sort_values(
+                        ascending=ascending, kind="stable", na_position="last"
+                    )
+                    .index.to_numpy()
+                    .astype(np.int64)
+                )
+            return self._orders[key]
+
+    def _lru(self, cache, key, build):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            value = build()
+            cache[key] = value
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+            return value
+
+    def rows(self, key, mask, sort_by=None, ascending=True):
+        """Posições das linhas do filtro key (ver o docstring da classe)."""
+        selected = self._lru(self._masks, key, lambda: np.asarray(mask(), dtype=bool))
+        if sort_by is None:
+            return self._lru(
+                self._rows, (key, None, True), lambda: np.flatnonzero(selected)
+            )
+
+        def build():
+            order = self.order(sort_by, ascending)
+            return order[selected[order]]
+
+        return self._lru(self._rows, (key, sort_by, ascending), build)
+
+    def page(self, rows, page, page_size, columns=None):
+        """
+        Linhas da página `page` (a partir de 1) de rows, só com columns
+        (todas, se None), com índice 0..n-1 relativo ao filtro.
+        """
+        start = (page - 1) * page_size
+        positions = rows[start : start + page_size]
+        if columns is None:
+            out = self.df.iloc[positions]
+        else:
+            out = self.df.iloc[positions, self.df.columns.get_indexer(list(columns))]
+        return out.set_axis(pd.RangeIndex(start, start + len(out)))
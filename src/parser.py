@@ -1,7 +1,44 @@
 # src/parser.py
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from lxml import etree
+import io
+import multiprocessing
+import os
 import re
+import threading
+import time
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pandas.api.types import union_categoricals
+
+from src.archive import ArchiveMember, expand_archives, open_member
+from src.cache import content_hash
+from src.instrument import record, stage
+from src.normalize import (
+    is_blank,
+    normalize_documents,
+    normalize_phone_numbers,
+    normalize_phones,
+    parse_amounts,
+    parse_dates,
+)
+
+# incrementar sempre que a saída do parser mudar (invalida o cache em disco)
+PARSER_VERSION = "5"
+
+# huge_tree (textos/profundidade acima dos limites de segurança do libxml2)
+# só com XML_UTILS_HUGE_TREE=1; vale também para os processos do pool
+HUGE_TREE = os.environ.get("XML_UTILS_HUGE_TREE") == "1"
+# opções de segurança do parser: sem rede, sem expandir entidades
+PARSER_OPTIONS = dict(resolve_entities=False, no_network=True, load_dtd=False)
+
+# caminho de extração reportado no manifesto
+PATH_FAST = "rapido"
+PATH_GENERIC = "generico"
+PATH_MIXED = "misto"
 
 CPF_RE = re.compile(r"\d{11}")
 CNPJ_RE = re.compile(r"\d{14}")
@@ -18,18 +55,8 @@ def clean_digits(s):
 
 
 def detect_doc_type(raw):
-    if not raw:
-        return "UNKNOWN"
-    if "*" in raw or "MASCAR" in raw.upper():
-        return "UNKNOWN"
-    digits = clean_digits(raw)
-    if not digits:
-        return "UNKNOWN"
-    if len(digits) == 11:
-        return "CPF"
-    if len(digits) == 14:
-        return "CNPJ"
-    return "UNKNOWN"
+    """Tipo de um único documento (ver src.normalize.normalize_documents)."""
+    return normalize_documents([raw])[1][0]
 
 
 def first_text(elem):
@@ -39,127 +66,914 @@ def first_text(elem):
     return t if t else None
 
 
+# tabelas de despacho: localname (minúsculo, sem namespace) -> campo do registro
+TITULO_FIELDS = {
+    "protocolo": "protocolo",
+    "numerotitulo": "numerotitulo",
+    "numero": "numerotitulo",
+    "numero_titulo": "numerotitulo",
+    "credor": "credor",
+    "valorprotestado": "valorprotestado",
+    "valor": "valorprotestado",
+    "dataprotesto": "dataprotesto",
+    "data_protesto": "dataprotesto",
+    "data": "dataprotesto",
+}
+DEVEDOR_FIELDS = {
+    "nome": "devedor_nome",
+    "nome_devedor": "devedor_nome",
+    "razao_social": "devedor_nome",
+    "documento": "devedor_documento_raw",
+    "cpf": "devedor_documento_raw",
+    "cnpj": "devedor_documento_raw",
+    "doc": "devedor_documento_raw",
+    "telefone": "telefone_raw",
+}
+# campos de cabeçalho do arquivo (fora dos títulos), lidos no mesmo passo
+HEADER_FIELDS = {
+    "totaltitulos": "total_titulos",
+}
+
+
+@lru_cache(maxsize=4096)
+def local_tag(tag):
+    """
+    Localname em minúsculas de uma tag lxml ("{ns}Nome" -> "nome").
+    Comentários e processing instructions (tag não-str) retornam None.
+    Memoizado: a normalização é feita uma vez por tag distinta.
+    """
+    if not isinstance(tag, str):
+        return None
+    return tag.rsplit("}", 1)[-1].lower()
+
+
 def find_child_text(parent, tag_names):
     if parent is None:
         return None
     names = {n.lower() for n in tag_names}
     for child in parent.iter():
-        if etree.QName(child).localname.lower() in names:
+        if local_tag(child.tag) in names:
             t = first_text(child)
             if t:
                 return t
     return None
 
 
-def parse_single_tree(tree, source_name="uploaded"):
-    root = tree.getroot()
-    records = []
-    # find all titulo nodes
-    titulo_nodes = [
-        e for e in root.iter() if etree.QName(e).localname.lower() == "titulo"
-    ]
+RECORD_COLUMNS = (
+    "source_file",
+    "protocolo",
+    "numerotitulo",
+    "credor",
+    "valorprotestado",
+    "dataprotesto",
+    "devedor_nome",
+    "devedor_documento_raw",
+    "devedor_documento",
+    "devedor_tipo",
+    "documento_valido",
+    "telefone_raw",
+    "telefone",
+)
+
+
+# todos os <telefone> de cada registro (lista de textos brutos, na ordem do
+# XML), ao lado das RECORD_COLUMNS nas colunas do parser e no cache; no
+# DataFrame vira a coluna PHONE_LIST_COLUMN (ver phone_lists)
+PHONES_COLUMN = "telefones_raw"
+PHONE_LIST_COLUMN = "telefones"
+PHONE_SEPARATOR = ";"
+
+# colunas tipadas que records_frame calcula a partir das brutas:
+# valorprotestado em centavos (Int64), dataprotesto como datetime64 e a flag
+# de valor / data preenchido que não pôde ser convertido
+TYPED_COLUMNS = ("valor_centavos", "data_protesto", "valor_data_invalido")
+
+# colunas muito repetitivas viram categóricas; as demais, strings Arrow
+CATEGORICAL_COLUMNS = ("source_file", "credor", "devedor_tipo", "dataprotesto")
+DOC_TIPOS = ("CPF", "CNPJ", "CPF_INVALIDO", "CNPJ_INVALIDO", "UNKNOWN")
+# colunas calculadas em lote por normalize_columns a partir das brutas
+DERIVED_COLUMNS = ("devedor_documento", "devedor_tipo", "documento_valido", "telefone")
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+
+def new_columns():
+    """
+    Colunas vazias (dict coluna -> lista) para o builder de registros: as
+    RECORD_COLUMNS e PHONES_COLUMN.
+    """
+    cols = {c: [] for c in RECORD_COLUMNS}
+    cols[PHONES_COLUMN] = []
+    return cols
+
+
+def append_titulo(t, source_name, cols):
+    """
+    Extrai os registros (um por devedor) de um único elemento <titulo> e os
+    acrescenta direto nas listas de `cols` (ver new_columns).
+
+    Percorre a subárvore uma única vez: cada elemento é despachado pelas
+    tabelas TITULO_FIELDS / DEVEDOR_FIELDS para o título e para todos os
+    <devedor> abertos naquele ponto, mantendo a semântica de
+    find_child_text (primeiro texto não vazio em ordem de documento).
+    Só as colunas brutas são preenchidas aqui; as de DERIVED_COLUMNS saem
+    depois, para o arquivo inteiro, de normalize_columns.
+    Retorna o número de registros acrescentados.
+    """
+    titulo = {}
+    implicit = {}  # devedor implícito (o próprio título) se não houver <devedor>
+    devedores = []
+    open_devedores = [implicit]
+    for event, elem in etree.iterwalk(t, events=("start", "end")):
+        name = local_tag(elem.tag)
+        if name == "devedor":
+            if event == "start":
+                d = {}
+                devedores.append(d)
+                open_devedores.append(d)
+            else:
+                open_devedores.pop()
+            continue
+        if event != "start":
+            continue
+        field = TITULO_FIELDS.get(name)
+        if field is not None and field not in titulo:
+            text = first_text(elem)
+            if text:
+                titulo[field] = text
+        field = DEVEDOR_FIELDS.get(name)
+        if field is not None:
+            text = first_text(elem)
+            if text:
+                for d in open_devedores:
+                    if field not in d:
+                        d[field] = text
+                    if field == "telefone_raw":
+                        d.setdefault(PHONES_COLUMN, []).append(text)
+
+    return _emit_titulo(titulo, devedores or [implicit], source_name, cols)
+
+
+def _emit_titulo(titulo, devedores, source_name, cols):
+    n = len(devedores)
+    cols[PHONES_COLUMN].extend(d.get(PHONES_COLUMN, []) for d in devedores)
+    for c in ("protocolo", "numerotitulo", "credor", "valorprotestado", "dataprotesto"):
+        cols[c].extend([titulo.get(c)] * n)
+    cols["source_file"].extend([source_name] * n)
+    for d in devedores:
+        cols["devedor_nome"].append(d.get("devedor_nome"))
+        cols["devedor_documento_raw"].append(d.get("devedor_documento_raw"))
+        cols["telefone_raw"].append(d.get("telefone_raw"))
+    return n
+
+
+def _take(name, elem, fields, target):
+    field = fields.get(name)
+    if field == "telefone_raw":
+        # todos os telefones, não só o primeiro
+        text = first_text(elem)
+        if text:
+            target.setdefault(field, text)
+            target.setdefault(PHONES_COLUMN, []).append(text)
+    elif field is not None and field not in target:
+        text = first_text(elem)
+        if text:
+            target[field] = text
+
+
+def _is_leaf(elem, name):
+    # titulo/devedor vazios ainda abrem registro no scan genérico
+    return len(elem) == 0 and name != "titulo" and name != "devedor"
+
+
+def append_titulo_fast(t, source_name, cols):
+    """
+    append_titulo para o layout canônico titulo/devedores/devedor/
+    telefones/telefone, com acesso direto aos filhos em vez do iterwalk.
+
+    Só aceita títulos em que os campos são folhas nesses níveis; qualquer
+    outra estrutura retorna None sem acrescentar nada (o chamador usa o
+    scan genérico). Quando aceita, o resultado é o mesmo de append_titulo.
+    """
+    titulo = {}
+    implicit = {}
+    devedores = []
+    for child in t:
+        name = local_tag(child.tag)
+        if name is None:
+            continue
+        if name == "devedores":
+            for d in child:
+                dname = local_tag(d.tag)
+                if dname is None:
+                    continue
+                if dname != "devedor":
+                    return None
+                dev = {}
+                devedores.append(dev)
+                for leaf in d:
+                    lname = local_tag(leaf.tag)
+                    if lname is None:
+                        continue
+                    if lname == "telefones":
+                        leaves = leaf
+                    elif _is_leaf(leaf, lname):
+                        leaves = (leaf,)
+                    else:
+                        return None
+                    for e in leaves:
+                        ename = local_tag(e.tag)
+                        if ename is None:
+                            continue
+                        if not _is_leaf(e, ename):
+                            return None
+                        _take(ename, e, TITULO_FIELDS, titulo)
+                        _take(ename, e, DEVEDOR_FIELDS, dev)
+        elif _is_leaf(child, name):
+            _take(name, child, TITULO_FIELDS, titulo)
+            _take(name, child, DEVEDOR_FIELDS, implicit)
+        else:
+            return None
+    return _emit_titulo(titulo, devedores or [implicit], source_name, cols)
+
+
+_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# descendentes cujo localname (sem diferenciar maiúsculas) é um HEADER_FIELDS,
+# em ordem de documento; a varredura roda dentro do libxml2
+_HEADER_XPATH = etree.XPath(
+    "descendant::*[%s]"
+    % " or ".join(
+        f"translate(local-name(), '{_UPPER}', '{_UPPER.lower()}') = '{name}'"
+        for name in HEADER_FIELDS
+    )
+)
+
+
+def _canonical_titulos(root, header):
+    """
+    Os <titulo> de root se o arquivo segue carta_cancelamento/titulos/titulo
+    (e não há <titulo> fora dali), capturando os HEADER_FIELDS de fora dos
+    títulos; None se não seguir.
+    """
+    if local_tag(root.tag) != "carta_cancelamento":
+        return None
+    titulos = []
+    for child in root:
+        name = local_tag(child.tag)
+        if name == "titulos":
+            if len(header) < len(HEADER_FIELDS):
+                # cabeçalho dentro dos títulos (raro): mesma ordem do genérico
+                for e in _HEADER_XPATH(child):
+                    _capture_header(local_tag(e.tag), e, header)
+            for t in child:
+                tname = local_tag(t.tag)
+                if tname == "titulo":
+                    titulos.append(t)
+                elif tname is not None:
+                    return None
+            continue
+        for e in child.iter():
+            ename = local_tag(e.tag)
+            if ename == "titulo":
+                return None
+            _capture_header(ename, e, header)
+    return titulos or None
+
+
+def _append_titulos(titulos, name, cols, nested=False):
+    """
+    Acrescenta os títulos com append_titulo_fast, caindo para append_titulo
+    nos que não seguem o layout canônico. nested (modo árvore): os <titulo>
+    aninhados num título do fallback também viram títulos, como no
+    _titulo_nodes. Retorna (nº de <titulo>, caminho).
+    """
+    n_titulos = n_fast = 0
+    for t in titulos:
+        # o fallback (raiz sem <titulo>) gera registros mas não conta título
+        if local_tag(t.tag) != "titulo":
+            append_titulo(t, name, cols)
+            continue
+        n_titulos += 1
+        if append_titulo_fast(t, name, cols) is not None:
+            n_fast += 1
+            continue
+        append_titulo(t, name, cols)
+        if nested:
+            for inner in t.iterdescendants():
+                if local_tag(inner.tag) == "titulo":
+                    n_titulos += 1
+                    append_titulo(inner, name, cols)
+    if n_fast and n_fast == n_titulos:
+        return n_titulos, PATH_FAST
+    return n_titulos, PATH_MIXED if n_fast else PATH_GENERIC
+
+
+def normalize_columns(cols):
+    """
+    Preenche as DERIVED_COLUMNS (documento limpo, tipo com validação dos
+    dígitos verificadores, documento_valido, telefone limpo) a partir das
+    colunas brutas, de uma vez para todas as linhas. Retorna cols.
+    """
+    documento, tipo, valido = normalize_documents(cols["devedor_documento_raw"])
+    cols["devedor_documento"] = documento.tolist()
+    cols["devedor_tipo"] = tipo.tolist()
+    cols["documento_valido"] = valido.tolist()
+    cols["telefone"] = normalize_phones(cols["telefone_raw"]).tolist()
+    return cols
+
+
+def _columns_to_records(cols):
+    n = len(cols["source_file"])
+    return [{c: cols[c][i] for c in RECORD_COLUMNS} for i in range(n)]
+
+
+def titulo_records(t, source_name="uploaded"):
+    """
+    Extrai os registros (um por devedor) de um único elemento <titulo>,
+    como lista de dicts.
+    """
+    cols = new_columns()
+    append_titulo(t, source_name, cols)
+    return _columns_to_records(normalize_columns(cols))
+
+
+def _capture_header(name, elem, header):
+    """Guarda em header o primeiro texto não vazio de cada HEADER_FIELDS."""
+    field = HEADER_FIELDS.get(name)
+    if field is not None and field not in header:
+        text = first_text(elem)
+        if text:
+            header[field] = text
+
+
+def _titulo_nodes(root, header=None):
+    # find all titulo nodes (e os campos de cabeçalho, se header for dado)
+    titulo_nodes = []
+    for e in root.iter():
+        name = local_tag(e.tag)
+        if name == "titulo":
+            titulo_nodes.append(e)
+        elif header is not None:
+            _capture_header(name, e, header)
     if not titulo_nodes:
         # fallback: maybe root is titulo
         titulo_nodes = [root]
+    return titulo_nodes
 
-    for t in titulo_nodes:
-        protocolo = find_child_text(t, ("protocolo",))
-        numerotitulo = find_child_text(t, ("numerotitulo", "numero", "numero_titulo"))
-        credor = find_child_text(t, ("credor",))
-        valorprotestado = find_child_text(t, ("valorprotestado", "valor"))
-        dataprotesto = find_child_text(t, ("dataprotesto", "data_protesto", "data"))
-
-        # devedores
-        devedor_nodes = []
-        for elem in t.iter():
-            if etree.QName(elem).localname.lower() == "devedor":
-                devedor_nodes.append(elem)
-        if not devedor_nodes:
-            # if none, maybe single implicit devedor under titulos
-            for elem in t.iter():
-                if etree.QName(elem).localname.lower() == "devedores":
-                    for ch in elem:
-                        if etree.QName(ch).localname.lower() == "devedor":
-                            devedor_nodes.append(ch)
-
-        if not devedor_nodes:
-            devedor_nodes = [t]
-
-        for d in devedor_nodes:
-            nome = find_child_text(d, ("nome", "nome_devedor", "razao_social"))
-            documento_raw = find_child_text(d, ("documento", "cpf", "cnpj", "doc"))
-            telefone_raw = None
-            for child in d.iter():
-                if etree.QName(child).localname.lower() == "telefone":
-                    telefone_raw = first_text(child)
-                    if telefone_raw:
-                        break
-
-            documento_clean = clean_digits(documento_raw) or (
-                documento_raw.strip() if documento_raw else None
-            )
-            telefone_clean = clean_digits(telefone_raw)
-
-            devedor_tipo = detect_doc_type(documento_raw)
-
-            records.append(
-                {
-                    "source_file": source_name,
-                    "protocolo": protocolo,
-                    "numerotitulo": numerotitulo,
-                    "credor": credor,
-                    "valorprotestado": valorprotestado,
-                    "dataprotesto": dataprotesto,
-                    "devedor_nome": nome,
-                    "devedor_documento_raw": documento_raw,
-                    "devedor_documento": documento_clean,
-                    "devedor_tipo": devedor_tipo,
-                    "telefone_raw": telefone_raw,
-                    "telefone": telefone_clean,
-                }
-            )
-    return records
+
+def parse_single_tree(tree, source_name="uploaded"):
+    cols = new_columns()
+    for t in _titulo_nodes(tree.getroot()):
+        append_titulo(t, source_name, cols)
+    return _columns_to_records(normalize_columns(cols))
 
 
-def parse_files_to_dataframe(file_objs):
+def iter_titulos_streaming(source, header=None):
     """
-    file_objs: list of uploaded file-like objects
-    returns: pd.DataFrame (all records) and list of parse_errors
+    Percorre o XML com iterparse e entrega cada <titulo> no seu evento "end".
+    Quando o consumidor pede o próximo, o elemento entregue (e os irmãos
+    anteriores) é liberado, então o consumo de memória fica constante,
+    independente do tamanho do arquivo. Se não houver <titulo>, entrega a
+    raiz (mesmo fallback de parse_single_tree).
+
+    Um <titulo> aninhado em outro só é entregue no fim do mais externo,
+    logo depois dele: a ordem é a de documento, como em parse_single_tree.
+
+    source: caminho ou file-like aceito por etree.iterparse
+    header: dict opcional preenchido com os HEADER_FIELDS encontrados
     """
-    all_records = []
-    errors = []
-    for f in file_objs:
+    seen_titulo = False
+    root = None
+    options = dict(PARSER_OPTIONS, huge_tree=HUGE_TREE)
+    for _event, elem in etree.iterparse(source, events=("end",), **options):
+        root = elem
+        name = local_tag(elem.tag)
+        if name != "titulo":
+            if header is not None:
+                _capture_header(name, elem, header)
+            continue
+        seen_titulo = True
+        # titulo aninhado em outro titulo: sai junto com o mais externo
+        if any(local_tag(a.tag) == "titulo" for a in elem.iterancestors()):
+            continue
+        yield elem
+        for inner in elem.iterdescendants():
+            if local_tag(inner.tag) == "titulo":
+                yield inner
+        elem.clear()
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+    # fallback: maybe root is titulo (o último "end" é sempre o da raiz)
+    if not seen_titulo and root is not None:
+        yield root
+
+
+def iter_records_streaming(source, source_name="uploaded"):
+    """
+    Versão streaming de parse_single_tree (ver iter_titulos_streaming).
+
+    source: caminho ou file-like aceito por etree.iterparse
+    yields: os mesmos dicts de registro de parse_single_tree, na mesma ordem
+    """
+    for t in iter_titulos_streaming(source):
+        for rec in titulo_records(t, source_name):
+            yield rec
+
+
+def compute_title_key(df):
+    """
+    Chave única do título, calculada de forma vetorizada: numerotitulo; senão
+    "P:" + protocolo; senão "ROWIDX:" + rótulo do índice da linha. Valores
+    nulos ou só com espaços são ignorados.
+    """
+    with stage("title_key", rows=len(df)):
+        key = ("ROWIDX:" + df.index.astype(str)).to_numpy(dtype=object)
+        # aplicado do menos para o mais prioritário: o último vence
+        for col, prefix in (("protocolo", "P:"), ("numerotitulo", "")):
+            if col not in df.columns:
+                continue
+            values = df[col]
+            text = values.astype(str)
+            valid = (values.notna() & text.str.strip().ne("")).to_numpy()
+            key[valid] = (prefix + text[valid]).to_numpy()
+        return pd.Series(key, index=df.index, dtype=STRING_DTYPE)
+
+
+def declared_total(text):
+    """TotalTitulos declarado no cabeçalho como int (None se ausente/inválido)."""
+    digits = clean_digits(text)
+    return int(digits) if digits else None
+
+
+_local = threading.local()
+
+
+def xml_parser():
+    """
+    XMLParser endurecido (PARSER_OPTIONS, huge_tree só se HUGE_TREE),
+    reaproveitado por thread: parsers lxml não podem ser usados por duas
+    threads ao mesmo tempo.
+    """
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = etree.XMLParser(huge_tree=HUGE_TREE, **PARSER_OPTIONS)
+        _local.parser = parser
+    return parser
+
+
+def _parse_tree(source, name, cols, found):
+    """
+    Modo árvore: no layout canônico, os títulos saem direto dos filhos de
+    <titulos> (sem varrer a árvore inteira), cada um pelo caminho rápido ou,
+    se sair do layout, pelo scan genérico; o resto do arquivo vai inteiro
+    pelo scan genérico. Retorna (nº de <titulo>, caminho).
+    """
+    root = etree.parse(source, xml_parser()).getroot()
+    titulos = _canonical_titulos(root, found)
+    if titulos is not None:
+        return _append_titulos(titulos, name, cols, nested=True)
+    n_titulos = 0
+    for t in _titulo_nodes(root, found):
+        if local_tag(t.tag) == "titulo":
+            n_titulos += 1
+        append_titulo(t, name, cols)
+    return n_titulos, PATH_GENERIC
+
+
+def _parse_source(source, name, streaming):
+    """
+    Parseia um arquivo (caminho ou file-like) e devolve (colunas, header):
+    os registros em formato colunar (dict coluna -> lista) e o cabeçalho
+    do arquivo, lido no mesmo passo ({"total_titulos_declarado",
+    "titulos_extraidos", "caminho"}). caminho diz se a extração foi pelo
+    caminho rápido do layout canônico, pelo scan genérico ou mista (parte
+    dos títulos por cada um).
+    """
+    start = time.perf_counter()
+    cols = new_columns()
+    found = {}
+    if streaming:
+        n_titulos, path = _append_titulos(
+            iter_titulos_streaming(source, found), name, cols
+        )
+    else:
+        n_titulos, path = _parse_tree(source, name, cols, found)
+    normalize_columns(cols)
+    header = {
+        "total_titulos_declarado": declared_total(found.get("total_titulos")),
+        "titulos_extraidos": n_titulos,
+        "caminho": path,
+        # tirado do header (e gravado como etapa "parse") por
+        # parse_files_to_columns
+        "segundos": time.perf_counter() - start,
+    }
+    return cols, header
+
+
+def _parse_payload(payload, name, error_name, streaming):
+    """
+    Worker do ProcessPoolExecutor: payload são os bytes do arquivo, um
+    caminho local ou o spec de um membro de .zip/.gz local. Retorna (colunas, None, header) ou
+    (None, mensagem de erro, None).
+    """
+    try:
+        if isinstance(payload, bytes):
+            source = io.BytesIO(payload)
+        elif isinstance(payload, tuple):
+            source = open_member(payload)
+        else:
+            source = payload
+        cols, header = _parse_source(source, name, streaming)
+        return cols, None, header
+    except Exception as e:
+        return None, f"{error_name}: {e}", None
+
+
+def _read_payload(f):
+    """Bytes (ou caminho) de um arquivo, para envio a outro processo."""
+    if isinstance(f, (str, os.PathLike)):
+        return os.fspath(f)
+    if isinstance(f, ArchiveMember) and f.spec is not None:
+        return f.spec  # o worker reabre o compactado local
+    if hasattr(f, "getvalue"):
+        return f.getvalue()
+    try:
+        return f.read()
+    finally:
         try:
-            # parse using lxml
-            tree = etree.parse(f)
-            recs = parse_single_tree(tree, source_name=getattr(f, "name", "uploaded"))
-            all_records.extend(recs)
+            f.seek(0)
+        except Exception:
+            pass
+
+
+def source_names(f):
+    """(source_file, nome usado nas mensagens de erro) de um arquivo."""
+    if isinstance(f, (str, os.PathLike)):
+        path = os.fspath(f)
+        return path, path
+    return getattr(f, "name", "uploaded"), getattr(f, "name", "file")
+
+
+def _parse_file_obj(f, streaming):
+    name, error_name = source_names(f)
+    try:
+        # parse using lxml
+        cols, header = _parse_source(f, name, streaming)
+        return cols, None, header
+    except Exception as e:
+        return None, f"{error_name}: {e}", None
+    finally:
+        try:
+            f.seek(0)
+        except Exception:
+            pass
+
+
+def _pool_context():
+    """
+    Contexto multiprocessing do pool: forkserver (spawn onde não existe,
+    como no Windows). O fork padrão copia um processo com várias threads
+    (servidor do Streamlit, ParseJob, pools do pyarrow) e pode travar.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _parse_in_pool(file_objs, streaming, workers):
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        futures = []
+        for f in file_objs:
+            name, error_name = source_names(f)
             try:
-                f.seek(0)
-            except Exception:
-                pass
-        except Exception as e:
-            errors.append(f"{getattr(f,'name','file')}: {e}")
+                payload = _read_payload(f)
+            except Exception as e:
+                # ilegível (ex.: .zip corrompido): erro sem passar pelo pool
+                futures.append((None, f"{error_name}: {e}", None))
+                continue
+            futures.append(
+                pool.submit(_parse_payload, payload, name, error_name, streaming)
+            )
+        # resultados na ordem de entrada, não na de conclusão
+        for fut in futures:
+            yield fut if isinstance(fut, tuple) else fut.result()
+
+
+def _cached_columns(cols, name):
+    cols = dict(cols)
+    n = len(next(iter(cols.values()), []))
+    cols["source_file"] = [name] * n
+    return cols
+
+
+def iter_parse_files(file_objs, streaming=False, workers=None, cache=None):
+    """
+    Como parse_files_to_columns, mas gera (i, (colunas, erro, header)) à
+    medida que cada arquivo fica pronto: primeiro os que vieram do cache,
+    depois os parseados, na ordem de entrada. i é a posição em file_objs.
+    """
+    file_objs = list(file_objs)
+    done = set()
+    keys = {}
+    if cache is not None:
+        for i, f in enumerate(file_objs):
+            start = time.perf_counter()
             try:
-                f.seek(0)
+                key = cache.key(content_hash(f), PARSER_VERSION)
             except Exception:
-                pass
+                continue  # ilegível: o parse abaixo reporta o erro
+            entry = cache.get(key)
+            if entry is None:
+                keys[i] = key
+                continue
+            cols, header = entry
+            name = source_names(f)[0]
+            cols = _cached_columns(cols, name)
+            record(
+                "cache",
+                time.perf_counter() - start,
+                rows=len(cols["source_file"]),
+                file=name,
+            )
+            done.add(i)
+            yield i, (cols, None, header)
+    pending = [i for i in range(len(file_objs)) if i not in done]
+    todo = [file_objs[i] for i in pending]
+
+    if workers and workers > 1 and len(todo) > 1:
+        parsed = _parse_in_pool(todo, streaming, workers)
+    else:
+        parsed = (_parse_file_obj(f, streaming) for f in todo)
+    for i, (cols, err, header) in zip(pending, parsed):
+        if err is None:
+            seconds = header.pop("segundos")
+            record(
+                "parse",
+                seconds,
+                rows=len(cols["source_file"]),
+                file=source_names(file_objs[i])[0],
+            )
+            if cache is not None and i in keys:
+                with stage("cache_write", rows=len(cols["source_file"])):
+                    cache.put(
+                        keys[i],
+                        {c: v for c, v in cols.items() if c != "source_file"},
+                        meta=header,
+                    )
+        yield i, (cols, err, header)
+
+
+def parse_files_to_columns(file_objs, streaming=False, workers=None, cache=None):
+    """
+    Parseia cada arquivo e devolve, na ordem de entrada, uma lista de
+    (colunas, erro, header): colunas é um dict coluna -> lista (None se houve
+    erro), erro é a mensagem "<nome>: <exceção>" (None se deu certo) e header
+    o cabeçalho do arquivo (ver _parse_source; None se houve erro).
+    Os parâmetros são os de parse_files_to_dataframe, mas os compactados já
+    devem vir expandidos (src.archive.expand_archives).
+    Cada arquivo vira um evento "parse" (ou "cache", se veio do cache) no
+    src.instrument.Recorder ativo.
+    """
+    file_objs = list(file_objs)
+    results = [None] * len(file_objs)
+    for i, result in iter_parse_files(file_objs, streaming, workers, cache):
+        results[i] = result
+    return results
+
+
+MANIFEST_COLUMNS = (
+    "source_file",
+    "total_titulos_declarado",
+    "titulos_extraidos",
+    "registros",
+    "divergente",
+    "caminho",
+    "erro",
+)
+
+
+def manifest_row(name, header, n_records, err=None):
+    """
+    Linha do manifesto de um arquivo: TotalTitulos declarado x títulos
+    extraídos. divergente fica nulo quando não há TotalTitulos (ou houve erro).
+    """
+    header = header or {}
+    declared = header.get("total_titulos_declarado")
+    extracted = header.get("titulos_extraidos")
+    return {
+        "source_file": name,
+        "total_titulos_declarado": declared,
+        "titulos_extraidos": extracted,
+        "registros": n_records if err is None else None,
+        "divergente": None if declared is None else declared != extracted,
+        "caminho": header.get("caminho"),
+        "erro": err,
+    }
+
+
+def manifest_frame(rows):
+    """DataFrame do manifesto (uma linha por arquivo, ver manifest_row)."""
+    rows = list(rows)
+    data = {c: [r[c] for r in rows] for c in MANIFEST_COLUMNS}
+    return pd.DataFrame(
+        {
+            "source_file": pd.array(data["source_file"], dtype=STRING_DTYPE),
+            "total_titulos_declarado": pd.array(
+                data["total_titulos_declarado"], dtype="Int64"
+            ),
+            "titulos_extraidos": pd.array(data["titulos_extraidos"], dtype="Int64"),
+            "registros": pd.array(data["registros"], dtype="Int64"),
+            "divergente": pd.array(data["divergente"], dtype="boolean"),
+            "caminho": pd.array(data["caminho"], dtype=STRING_DTYPE),
+            "erro": pd.array(data["erro"], dtype=STRING_DTYPE),
+        }
+    )
+
+
+def typed_columns(columns):
+    """
+    As TYPED_COLUMNS a partir de valorprotestado e dataprotesto brutos
+    (src.normalize.parse_amounts / parse_dates): valor_centavos Int64 e
+    data_protesto datetime64, nulos onde não há valor ou ele não converteu;
+    valor_data_invalido True se um dos dois está preenchido mas não converteu.
+    """
+    cents, cents_ok = parse_amounts(columns["valorprotestado"])
+    dates, dates_ok = parse_dates(columns["dataprotesto"])
+    invalid = (~cents_ok & ~is_blank(columns["valorprotestado"])) | (
+        ~dates_ok & ~is_blank(columns["dataprotesto"])
+    )
+    return {
+        "valor_centavos": pd.arrays.IntegerArray(cents, ~cents_ok),
+        "data_protesto": dates,
+        "valor_data_invalido": invalid,
+    }
+
+
+def phone_lists(raw_lists):
+    """
+    Listas de telefones brutos (uma por registro) -> coluna de strings Arrow
+    com os telefones válidos normalizados de cada registro
+    (src.normalize.normalize_phone_numbers), sem repetição, na ordem do XML
+    e separados por PHONE_SEPARATOR; nulo se o registro não tem nenhum.
+    Tudo roda sobre a lista achatada: a normalização sobre os valores
+    distintos e a repetição dentro de um registro é detectada por hash de
+    (registro, telefone).
+    """
+    arr = pa.array(raw_lists, type=pa.list_(pa.string()))
+    parents = pc.list_parent_indices(arr).to_numpy()
+    phones, _ = normalize_phone_numbers(
+        pc.list_flatten(arr).to_numpy(zero_copy_only=False)
+    )
+    keep = pd.notna(phones)
+    parents, phones = parents[keep], phones[keep]
+    keep = (
+        ~pd.DataFrame({"registro": parents, "hash": pd.util.hash_array(phones)})
+        .duplicated()
+        .to_numpy()
+    )
+    parents, phones = parents[keep], phones[keep]
+    counts = np.bincount(parents, minlength=len(arr))
+    offsets = np.zeros(len(arr) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    lists = pa.ListArray.from_arrays(offsets, pa.array(phones, type=pa.string()))
+    joined = pc.binary_join(lists, PHONE_SEPARATOR)
+    joined = pc.if_else(pa.array(counts > 0), joined, pa.scalar(None, pa.string()))
+    return pd.array(joined, dtype=STRING_DTYPE)
+
+
+def phones_frame(df):
+    """
+    Tabela longa dos telefones do df (um por linha): registro (posição da
+    linha no df), telefone (55 + DDD + número), ddd e celular, tirada de
+    PHONE_LIST_COLUMN. Vazia se o df não tem essa coluna.
+    """
+    if PHONE_LIST_COLUMN not in df.columns or df.empty:
+        return pd.DataFrame(
+            {
+                "registro": np.zeros(0, dtype=np.int64),
+                "telefone": pd.array([], dtype=STRING_DTYPE),
+                "ddd": pd.array([], dtype=STRING_DTYPE),
+                "celular": np.zeros(0, dtype=bool),
+            }
+        )
+    text = pa.array(df[PHONE_LIST_COLUMN].astype(STRING_DTYPE), type=pa.string())
+    arr = pc.split_pattern(text, PHONE_SEPARATOR)
+    flat = pc.list_flatten(arr)
+    return pd.DataFrame(
+        {
+            "registro": pc.list_parent_indices(arr).to_numpy().astype(np.int64),
+            "telefone": pd.array(flat, dtype=STRING_DTYPE),
+            "ddd": pd.array(pc.utf8_slice_codeunits(flat, 2, 4), dtype=STRING_DTYPE),
+            # 55 + DDD + 9 dígitos
+            "celular": pc.equal(pc.utf8_length(flat), 13)
+            .to_numpy(zero_copy_only=False)
+            .astype(bool),
+        }
+    )
+
+
+def records_frame(columns):
+    """
+    DataFrame de registros (sem title_key) a partir de colunas, já com os
+    dtypes compactos: categóricas para CATEGORICAL_COLUMNS (devedor_tipo com
+    as categorias fixas de DOC_TIPOS), boolean para documento_valido,
+    strings Arrow para o resto das RECORD_COLUMNS e, no fim, as
+    TYPED_COLUMNS (typed_columns) e PHONE_LIST_COLUMN (phone_lists de
+    PHONES_COLUMN; vazia para colunas sem ela).
+    """
+    data = {}
+    with stage("dataframe", rows=len(columns["source_file"])):
+        for c in RECORD_COLUMNS:
+            if c == "devedor_tipo":
+                data[c] = pd.Categorical(columns[c], categories=DOC_TIPOS)
+            elif c == "documento_valido":
+                data[c] = pd.array(columns[c], dtype="boolean")
+            elif c in CATEGORICAL_COLUMNS:
+                # categorias sempre object, mesmo sem nenhum valor (senão
+                # viram float64 e o union_categoricals de concat_records falha)
+                codes, uniques = pd.factorize(
+                    np.asarray(columns[c], dtype=object), sort=True
+                )
+                data[c] = pd.Categorical.from_codes(
+                    codes, categories=pd.Index(uniques, dtype=object)
+                )
+            else:
+                data[c] = pd.array(columns[c], dtype=STRING_DTYPE)
+        data.update(typed_columns(columns))
+        data[PHONE_LIST_COLUMN] = phone_lists(
+            columns.get(PHONES_COLUMN, [[]] * len(columns["source_file"]))
+        )
+        return pd.DataFrame(data)
+
+
+def concat_records(frames):
+    """
+    Concatena frames de records_frame (sem title_key), mantendo os dtypes
+    compactos, e calcula title_key sobre o resultado.
+    """
+    frames = list(frames) or [records_frame(new_columns())]
+    with stage("concat", rows=sum(len(f) for f in frames)):
+        # categorias diferentes por arquivo fazem o concat cair para object;
+        # devedor_tipo tem categorias fixas e o concat já preserva
+        merged = {
+            c: union_categoricals([f[c] for f in frames], sort_categories=True)
+            for c in CATEGORICAL_COLUMNS
+            if c != "devedor_tipo"
+        }
+        df = pd.concat(
+            [f.drop(columns=list(merged)) for f in frames], ignore_index=True
+        )
+        for c, values in merged.items():
+            df[c] = values
+        df = df[list(frames[0].columns)]
+    df["title_key"] = compute_title_key(df)
+    return df
+
+
+def parse_files_to_dataframe(
+    file_objs, streaming=False, workers=None, cache=None, with_manifest=False
+):
+    """
+    file_objs: list of uploaded file-like objects (or local paths); .zip e
+        .xml.gz são lidos sem extrair para disco, um arquivo por membro .xml,
+        com source_file "arquivo.zip/membro.xml" (ver src.archive)
+    streaming: se True, usa iter_records_streaming (memória constante por
+        arquivo) em vez de montar a árvore inteira com etree.parse
+    workers: se > 1, parseia os arquivos em paralelo num ProcessPoolExecutor
+        com esse número de processos; cada worker devolve colunas (não
+        dicts), e o resultado é montado na ordem de entrada
+    cache: src.cache.ParseCache opcional; só os arquivos cujo conteúdo
+        (hash + PARSER_VERSION) não está no cache são parseados. Acertos e
+        faltas ficam em cache.hits / cache.misses
+    with_manifest: se True, devolve também o manifesto por arquivo
+        (manifest_frame: TotalTitulos declarado, títulos extraídos,
+        registros, divergente, erro)
+    returns: pd.DataFrame (all records) and list of parse_errors
+        (+ manifesto, se with_manifest)
+    """
+    file_objs = list(expand_archives(file_objs))
+    results = parse_files_to_columns(
+        file_objs, streaming=streaming, workers=workers, cache=cache
+    )
+    columns = new_columns()
+    errors = []
+    manifest = []
+    for f, (cols, err, header) in zip(file_objs, results):
+        n = 0
+        if err is not None:
+            errors.append(err)
+        else:
+            n = len(cols["source_file"])
+            for c in columns:
+                columns[c].extend(cols[c])
+        manifest.append(manifest_row(source_names(f)[0], header, n, err))
 
-    df = pd.DataFrame(all_records)
+    df = records_frame(columns)
     # ensure columns exist
-    if df.empty:
-        return df, errors
-
-    # title_key
-    def title_key(row):
-        if (
-            pd.notna(row.get("numerotitulo"))
-            and str(row.get("numerotitulo")).strip() != ""
-        ):
-            return str(row.get("numerotitulo"))
-        if pd.notna(row.get("protocolo")) and str(row.get("protocolo")).strip() != "":
-            return "P:" + str(row.get("protocolo"))
-        return f"ROWIDX:{row.name}"
-
-    df["title_key"] = df.apply(title_key, axis=1)
+    if not df.empty:
+        df["title_key"] = compute_title_key(df)
+    if with_manifest:
+        return df, errors, manifest_frame(manifest)
     return df, errors
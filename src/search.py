@@ -0,0 +1,108 @@
+# src/search.py
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SEARCH_COLUMNS = ("devedor_nome", "devedor_documento_raw", "devedor_documento")
+# separador entre campos: não aparece em XML nem em texto digitado, então um
+# termo nunca casa "atravessando" dois campos
+_SEP = "\x00"
+
+
+def fold_accents(text):
+    """Remove acentos (NFKD sem marcas combinantes): "José" -> "Jose"."""
+    return "".join(
+        ch
+        for ch in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(ch)
+    )
+
+
+def _fold_accents_arrow(arr):
+    return pc.replace_substring_regex(
+        pc.utf8_normalize(arr, form="NFKD"), pattern=r"\p{Mn}", replacement=""
+    )
+
+
+class SearchIndex:
+    """
+    Índice de busca textual por nome/documento do devedor, montado uma vez
+    por dataset.
+
+    Cada linha vira um texto normalizado (minúsculas; opcionalmente sem
+    acentos) com os campos de SEARCH_COLUMNS concatenados. Os textos
+    distintos são fatorados, então a busca roda só sobre os valores únicos
+    e é expandida para as linhas por código. Uma busca que estende a
+    anterior (usuário digitando mais letras) só reavalia os candidatos que já
+    casavam.
+
+    Com accent_insensitive=False, mask(termo) devolve exatamente as linhas
+    em que termo.lower() é substring do nome, do documento bruto ou do
+    documento limpo.
+    """
+
+    def __init__(self, df, accent_insensitive=False, cache_size=32):
+        self.accent_insensitive = accent_insensitive
+        parts = []
+        for c in SEARCH_COLUMNS:
+            if c in df.columns:
+                col = df[c].astype("string[pyarrow]").fillna("")
+            else:
+                col = pd.Series("", index=df.index, dtype="string[pyarrow]")
+            parts.append(col.str.lower())
+        haystack = parts[0]
+        for p in parts[1:]:
+            haystack = haystack + _SEP + p
+        codes, uniques = pd.factorize(haystack)
+        self._codes = codes
+        uniques = pa.array(np.asarray(uniques, dtype=object), type=pa.string())
+        if accent_insensitive:
+            uniques = _fold_accents_arrow(uniques)
+        self._uniques = uniques
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def __len__(self):
+        return len(self._codes)
+
+    def normalize_query(self, text):
+        q = text.lower()
+        return fold_accents(q) if self.accent_insensitive else q
+
+    def _unique_hits(self, q):
+        hits = self._cache.get(q)
+        if hits is not None:
+            self._cache.move_to_end(q)
+            return hits
+        if _SEP in q:
+            hits = np.zeros(len(self._uniques), dtype=bool)
+        else:
+            # o termo mais longo em cache que seja parte deste: só os
+            # candidatos dele podem casar
+            prev = max((k for k in self._cache if k in q), key=len, default=None)
+            cand = None if prev is None else np.flatnonzero(self._cache[prev])
+            # com muitos candidatos o take custa mais que varrer tudo de novo
+            if cand is None or len(cand) > len(self._uniques) // 4:
+                hits = pc.match_substring(self._uniques, q).to_numpy(
+                    zero_copy_only=False
+                )
+            else:
+                sub = pc.match_substring(self._uniques.take(cand), q)
+                hits = np.zeros(len(self._uniques), dtype=bool)
+                hits[cand[sub.to_numpy(zero_copy_only=False)]] = True
+        self._cache[q] = hits
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return hits
+
+    def mask(self, text):
+        """Array booleano (posicional, uma posição por linha do df)."""
+        if not text:
+            return np.ones(len(self._codes), dtype=bool)
+        hits = self._unique_hits(self.normalize_query(text))
+        # código -1 (não ocorre: campos nulos viram "") cairia no sentinela
+        return np.append(hits, False)[self._codes]
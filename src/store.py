@@ -0,0 +1,476 @@
+# src/store.py
+"""
+Armazenamento dos registros em SQLite, para lotes maiores que a memória.
+
+RecordStore grava os registros parseados em lotes num banco SQLite local
+(sqlite3 da biblioteca padrão) e calcula os indicadores em SQL, sem montar
+o DataFrame inteiro: metrics() devolve o mesmo dict de compute_all_metrics,
+protocols_multi_by_type e cpf_cnpj_lists os mesmos resultados de
+src.metrics, sobre todos os arquivos do banco.
+
+As colunas que as métricas comparam são preparadas em Python na inserção,
+com as mesmas funções do caminho pandas: title_key (compute_title_key, com
+ROWIDX pela posição global da linha), protocolo_norm (protocolo sem espaços;
+NULL se vazio), has_phone e as TYPED_COLUMNS (typed_columns: valor em
+centavos, data ISO e a flag de conversão). Há índices em devedor_documento, protocolo e
+title_key.
+
+Os telefones normalizados de cada registro (phone_lists) ficam na coluna
+telefones e, um por linha, na tabela phones (ver phones_frame), ligada a
+records por row_idx; has_mobile marca os registros com algum celular.
+"""
+
+import sqlite3
+from itertools import groupby, islice
+
+import numpy as np
+import pandas as pd
+
+from src.archive import expand_archives
+from src.instrument import stage
+from src.metrics import select_multi_by_type, stripped_text
+from src.parser import (
+    PHONE_LIST_COLUMN,
+    PHONE_SEPARATOR,
+    PHONES_COLUMN,
+    RECORD_COLUMNS,
+    TYPED_COLUMNS,
+    compute_title_key,
+    manifest_frame,
+    manifest_row,
+    parse_files_to_columns,
+    phone_lists,
+    phones_frame,
+    records_frame,
+    source_names,
+    typed_columns,
+)
+
+BATCH_FILES = 64
+STORE_COLUMNS = (
+    RECORD_COLUMNS
+    + TYPED_COLUMNS
+    + ("title_key", "protocolo_norm", "has_phone", PHONE_LIST_COLUMN, "has_mobile")
+)
+INTEGER_COLUMNS = (
+    "documento_valido",
+    "has_phone",
+    "has_mobile",
+    "valor_centavos",
+    "valor_data_invalido",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    row_idx INTEGER PRIMARY KEY,
+    %s
+);
+CREATE INDEX IF NOT EXISTS idx_records_documento
+    ON records (devedor_documento, devedor_tipo);
+CREATE INDEX IF NOT EXISTS idx_records_documento_protocolo
+    ON records (devedor_documento, protocolo_norm);
+CREATE INDEX IF NOT EXISTS idx_records_protocolo ON records (protocolo_norm);
+CREATE INDEX IF NOT EXISTS idx_records_title_key
+    ON records (title_key, has_phone, devedor_tipo);
+CREATE INDEX IF NOT EXISTS idx_records_source_file ON records (source_file);
+CREATE TABLE IF NOT EXISTS phones (
+    row_idx INTEGER,
+    telefone TEXT,
+    ddd TEXT,
+    celular INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_phones_row_idx ON phones (row_idx);
+CREATE INDEX IF NOT EXISTS idx_phones_telefone ON phones (telefone);
+CREATE TABLE IF NOT EXISTS files (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_file TEXT UNIQUE,
+    total_titulos_declarado INTEGER,
+    titulos_extraidos INTEGER,
+    registros INTEGER,
+    divergente INTEGER,
+    caminho TEXT,
+    erro TEXT
+);
+""" % ",\n    ".join(
+    f"{c} INTEGER" if c in INTEGER_COLUMNS else f"{c} TEXT" for c in STORE_COLUMNS
+)
+
+# um título por linha, com as flags de compute_all_metrics
+TITLE_FLAGS_SQL = """
+SELECT MAX(has_phone) AS p,
+       MAX(IFNULL(devedor_tipo = 'CPF', 0)) AS c,
+       MAX(IFNULL(devedor_tipo = 'CNPJ', 0)) AS n,
+       MAX(valor_centavos) AS v,
+       MAX(has_mobile) AS m
+FROM records GROUP BY title_key
+"""
+
+# pares únicos (documento, protocolo), como doc_protocols de metric_partials
+DOC_PROTOCOLS_SQL = """
+SELECT DISTINCT devedor_documento AS d, protocolo_norm AS p FROM records
+WHERE devedor_documento IS NOT NULL AND protocolo_norm IS NOT NULL
+"""
+
+
+class RecordStore:
+    """
+    Registros de vários arquivos num banco SQLite (path; ":memory:" para um
+    banco temporário). Os arquivos são identificados pelo nome (source_file),
+    como no IncrementalDataset: adicionar de novo um nome existente substitui
+    os registros dele (que passam para o fim) e remove_file do nome de um
+    .zip remove seus membros.
+    """
+
+    def __init__(self, path=":memory:", batch_files=BATCH_FILES):
+        self.path = path
+        self.batch_files = batch_files
+        # check_same_thread=False: o Streamlit roda cada rerun numa thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        # bancos criados antes das TYPED_COLUMNS: as linhas antigas ficam
+        # com NULL nelas até o arquivo ser adicionado de novo
+        existing = {r[1] for r in self.conn.execute("PRAGMA table_info(records)")}
+        for c in STORE_COLUMNS:
+            if c not in existing:
+                kind = "INTEGER" if c in INTEGER_COLUMNS else "TEXT"
+                self.conn.execute(f"ALTER TABLE records ADD COLUMN {c} {kind}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next_row(self):
+        row = self.conn.execute("SELECT MAX(row_idx) FROM records").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def add_columns(self, name, cols, header=None, err=None):
+        """
+        Grava os registros de um arquivo (um resultado de
+        parse_files_to_columns: colunas, erro, header) e a linha dele no
+        manifesto, substituindo um arquivo de mesmo nome.
+        """
+        n = 0 if cols is None else len(cols["source_file"])
+        with self.conn:
+            self._delete(name, members=False)
+            if n:
+                self._insert(cols, n)
+            row = manifest_row(name, header, n, err)
+            self.conn.execute(
+                "INSERT INTO files (source_file, total_titulos_declarado, "
+                "titulos_extraidos, registros, divergente, caminho, erro) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    row["source_file"],
+                    row["total_titulos_declarado"],
+                    row["titulos_extraidos"],
+                    row["registros"],
+                    row["divergente"],
+                    row["caminho"],
+                    row["erro"],
+                ),
+            )
+
+    def _insert(self, cols, n):
+        start = self._next_row()
+        with stage("store_insert", rows=n):
+            keys = pd.DataFrame(
+                {"protocolo": cols["protocolo"], "numerotitulo": cols["numerotitulo"]},
+                index=pd.RangeIndex(start, start + n),
+            )
+            prot_txt, prot_valid = stripped_text(pd.Series(cols["protocolo"]))
+            typed = typed_columns(cols)
+            dates = pd.Series(typed["data_protesto"]).dt.strftime("%Y-%m-%d")
+            joined = phone_lists(cols.get(PHONES_COLUMN, [[]] * n))
+            phones = phones_frame(pd.DataFrame({PHONE_LIST_COLUMN: joined}))
+            registro = phones["registro"].to_numpy()
+            has_mobile = np.zeros(n, dtype=int)
+            has_mobile[registro[phones["celular"].to_numpy()]] = 1
+            extra = {
+                "title_key": compute_title_key(keys).tolist(),
+                "protocolo_norm": [
+                    p if ok else None for p, ok in zip(prot_txt.tolist(), prot_valid)
+                ],
+                "has_phone": stripped_text(pd.Series(cols["telefone"]))[1]
+                .astype(int)
+                .tolist(),
+                "documento_valido": [
+                    None if v is None else int(v) for v in cols["documento_valido"]
+                ],
+                "valor_centavos": pd.Series(typed["valor_centavos"], dtype=object)
+                .where(pd.notna(typed["valor_centavos"]), None)
+                .tolist(),
+                "data_protesto": dates.astype(object)
+                .where(dates.notna(), None)
+                .tolist(),
+                "valor_data_invalido": typed["valor_data_invalido"]
+                .astype(int)
+                .tolist(),
+                PHONE_LIST_COLUMN: pd.Series(joined, dtype=object)
+                .where(pd.notna(joined), None)
+                .tolist(),
+                "has_mobile": has_mobile.tolist(),
+            }
+            columns = [extra[c] if c in extra else cols[c] for c in STORE_COLUMNS]
+            self.conn.executemany(
+                "INSERT INTO records (row_idx, %s) VALUES (%s)"
+                % (", ".join(STORE_COLUMNS), ", ".join("?" * (len(STORE_COLUMNS) + 1))),
+                zip(range(start, start + n), *columns),
+            )
+            self.conn.executemany(
+                "INSERT INTO phones (row_idx, telefone, ddd, celular) "
+                "VALUES (?, ?, ?, ?)",
+                zip(
+                    (registro + start).tolist(),
+                    phones["telefone"].tolist(),
+                    phones["ddd"].tolist(),
+                    phones["celular"].astype(int).tolist(),
+                ),
+            )
+
+    def add_files(self, files, streaming=True, workers=None, cache=None):
+        """
+        Parseia e grava arquivos (como IncrementalDataset.add_files), de
+        batch_files em batch_files: só um lote de registros fica em memória
+        por vez. Retorna a lista de erros.
+        """
+        files = expand_archives(files)
+        errors = []
+        while True:
+            batch = list(islice(files, self.batch_files))
+            if not batch:
+                return errors
+            results = parse_files_to_columns(
+                batch, streaming=streaming, workers=workers, cache=cache
+            )
+            for f, (cols, err, header) in zip(batch, results):
+                if err is not None:
+                    errors.append(err)
+                self.add_columns(source_names(f)[0], cols, header, err)
+
+    def _delete(self, name, members=True):
+        names = "source_file = ?"
+        args = [name]
+        if members:
+            names += " OR substr(source_file, 1, ?) = ?"
+            args += [len(name) + 1, name + "/"]
+        self.conn.execute(
+            "DELETE FROM phones WHERE row_idx IN "
+            f"(SELECT row_idx FROM records WHERE {names})",
+            args,
+        )
+        self.conn.execute(f"DELETE FROM records WHERE {names}", args)
+        self.conn.execute(f"DELETE FROM files WHERE {names}", args)
+
+    def remove_file(self, name):
+        """Remove o arquivo (ou, para um .zip, todos os seus membros)."""
+        with self.conn:
+            self._delete(name)
+
+    @property
+    def names(self):
+        return [
+            r[0]
+            for r in self.conn.execute("SELECT source_file FROM files ORDER BY seq")
+        ]
+
+    @property
+    def errors(self):
+        return [
+            r[0]
+            for r in self.conn.execute(
+                "SELECT erro FROM files WHERE erro IS NOT NULL ORDER BY seq"
+            )
+        ]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    @property
+    def manifest(self):
+        """Manifesto por arquivo (ver src.parser.manifest_frame)."""
+        cur = self.conn.execute(
+            "SELECT source_file, total_titulos_declarado, titulos_extraidos, "
+            "registros, divergente, caminho, erro FROM files ORDER BY seq"
+        )
+        names = [d[0] for d in cur.description]
+        rows = []
+        for values in cur:
+            row = dict(zip(names, values))
+            if row["divergente"] is not None:
+                row["divergente"] = bool(row["divergente"])
+            rows.append(row)
+        return manifest_frame(rows)
+
+    def select_columns(self, columns, names=None):
+        """
+        Dict coluna -> lista com as colunas pedidas dos registros (de todos
+        os arquivos, ou só dos source_file em names), na ordem de inserção.
+        """
+        sql = "SELECT %s FROM records" % ", ".join(columns)
+        if names is not None:
+            self.conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS selected (source_file TEXT)"
+            )
+            self.conn.execute("DELETE FROM selected")
+            self.conn.executemany(
+                "INSERT INTO selected VALUES (?)", ((n,) for n in names)
+            )
+            sql += " WHERE source_file IN (SELECT source_file FROM selected)"
+        rows = self.conn.execute(sql + " ORDER BY row_idx").fetchall()
+        values = list(zip(*rows)) or [()] * len(columns)
+        return {c: list(v) for c, v in zip(columns, values)}
+
+    def iter_frames(self, chunk_rows=100_000):
+        """
+        Os registros (colunas de RECORD_COLUMNS + title_key), em DataFrames
+        de até chunk_rows linhas, na ordem de inserção.
+        """
+        columns = RECORD_COLUMNS + ("title_key", PHONE_LIST_COLUMN)
+        cur = self.conn.execute(
+            "SELECT %s FROM records ORDER BY row_idx" % ", ".join(columns)
+        )
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                return
+            values = list(zip(*rows))
+            cols = dict(zip(columns, values))
+            cols["documento_valido"] = [
+                None if v is None else bool(v) for v in cols["documento_valido"]
+            ]
+            # os telefones gravados já estão normalizados, e normalizar de
+            # novo não os altera
+            cols[PHONES_COLUMN] = [
+                [] if t is None else t.split(PHONE_SEPARATOR)
+                for t in cols.pop(PHONE_LIST_COLUMN)
+            ]
+            df = records_frame(cols)
+            df["title_key"] = pd.array(cols["title_key"], dtype="string[pyarrow]")
+            yield df
+
+    def metrics(self):
+        """Mesmo dict de compute_all_metrics, calculado em SQL."""
+        with stage("store_metrics", rows=len(self)):
+            q = self.conn.execute
+            (
+                total,
+                phone,
+                cpf,
+                cnpj,
+                both,
+                mobile,
+                n_valor,
+                valor,
+                valor_cpf,
+                valor_cnpj,
+            ) = q(
+                "SELECT COUNT(*), IFNULL(SUM(p), 0), IFNULL(SUM(c), 0), "
+                "IFNULL(SUM(n), 0), IFNULL(SUM(c AND n), 0), IFNULL(SUM(m), 0), "
+                "COUNT(v), IFNULL(SUM(v), 0), "
+                "IFNULL(SUM(CASE WHEN c THEN v END), 0), "
+                "IFNULL(SUM(CASE WHEN n THEN v END), 0) FROM (%s)" % TITLE_FLAGS_SQL
+            ).fetchone()
+            unique_phones = q("SELECT COUNT(DISTINCT telefone) FROM phones").fetchone()[
+                0
+            ]
+            qtd_cpfs, qtd_cnpjs = (
+                q(
+                    "SELECT COUNT(DISTINCT devedor_documento) FROM records "
+                    "WHERE devedor_tipo = ?",
+                    (tipo,),
+                ).fetchone()[0]
+                for tipo in ("CPF", "CNPJ")
+            )
+            unique_total = q(
+                "SELECT COUNT(DISTINCT devedor_documento) FROM records"
+            ).fetchone()[0]
+            summary = self.multi_protocol_summary(tipos=("CPF", "CNPJ"))
+            df_cpf_multi, cpf_multi_count = select_multi_by_type(summary, "CPF")
+            df_cnpj_multi, cnpj_multi_count = select_multi_by_type(summary, "CNPJ")
+        return {
+            "total_titulos": int(total),
+            "titles_with_phone": int(phone),
+            "titles_with_cpf": int(cpf),
+            "titles_with_cnpj": int(cnpj),
+            "titles_with_both": int(both),
+            "titles_with_valid_mobile": int(mobile),
+            "unique_phones": int(unique_phones),
+            "qtd_cpfs_unicos": int(qtd_cpfs),
+            "qtd_cnpjs_unicos": int(qtd_cnpjs),
+            "unique_devedores_total": int(unique_total),
+            "titles_with_valor": int(n_valor),
+            "valor_total_centavos": int(valor),
+            "valor_medio_centavos": valor / n_valor if n_valor else 0.0,
+            "valor_cpf_centavos": int(valor_cpf),
+            "valor_cnpj_centavos": int(valor_cnpj),
+            "df_cpf_multi": df_cpf_multi,
+            "df_cnpj_multi": df_cnpj_multi,
+            "cpf_multi_count": int(cpf_multi_count),
+            "cnpj_multi_count": int(cnpj_multi_count),
+        }
+
+    def multi_protocol_summary(self, tipos=("CPF", "CNPJ")):
+        """Mesmo resultado de src.metrics.multi_protocol_summary, em SQL."""
+        flags = "".join(
+            ", EXISTS (SELECT 1 FROM records r WHERE r.devedor_documento = m.d "
+            "AND r.devedor_tipo = ?)"
+            for _ in tipos
+        )
+        multi = self.conn.execute(
+            "WITH pairs AS (%s), "
+            "m AS (SELECT d, COUNT(*) AS n FROM pairs GROUP BY d HAVING n > 1) "
+            "SELECT d, n%s FROM m ORDER BY d" % (DOC_PROTOCOLS_SQL, flags),
+            tuple(tipos),
+        ).fetchall()
+        # lista ordenada de protocolos só para os documentos selecionados
+        pairs = self.conn.execute(
+            "WITH pairs AS (%s), "
+            "m AS (SELECT d FROM pairs GROUP BY d HAVING COUNT(*) > 1) "
+            "SELECT d, p FROM pairs WHERE d IN (SELECT d FROM m) ORDER BY d, p"
+            % DOC_PROTOCOLS_SQL
+        )
+        joined = [
+            ", ".join(p for _, p in group)
+            for _, group in groupby(pairs, lambda r: r[0])
+        ]
+        summary = pd.DataFrame(
+            {
+                "devedor_documento": pd.Series([r[0] for r in multi], dtype=object),
+                "qtd_protocolos_unicos": pd.Series(
+                    [r[1] for r in multi], dtype="int64"
+                ),
+                "protocolos_unicos": pd.Series(joined, dtype=object),
+            }
+        )
+        for i, t in enumerate(tipos):
+            summary[t] = pd.Series([bool(r[2 + i]) for r in multi], dtype=bool)
+        return summary
+
+    def protocols_multi_by_type(self, tipo="CPF"):
+        """Mesmo (df_multi, count) de src.metrics.protocols_multi_by_type."""
+        return select_multi_by_type(self.multi_protocol_summary(tipos=(tipo,)), tipo)
+
+    def cpf_cnpj_lists(self):
+        """Mesmo resultado de make_cpf_cnpj_lists sobre todos os registros."""
+        return tuple(
+            [
+                r[0]
+                for r in self.conn.execute(
+                    "SELECT DISTINCT devedor_documento FROM records "
+                    "WHERE devedor_tipo = ? AND devedor_documento IS NOT NULL "
+                    "ORDER BY devedor_documento",
+                    (tipo,),
+                )
+            ]
+            for tipo in ("CPF", "CNPJ")
+        )
@@ -2,7 +2,10 @@
 import plotly.express as px
 import pandas as pd
 
+from src.instrument import timed
 
+
+@timed("figuras")
 def plot_pie_cpf_cnpj(qtd_cpfs, qtd_cnpjs):
     df = pd.DataFrame(
         {"tipo": ["CPF", "CNPJ"], "quantidade": [int(qtd_cpfs), int(qtd_cnpjs)]}
@@ -19,6 +22,7 @@ def plot_pie_cpf_cnpj(qtd_cpfs, qtd_cnpjs):
     return fig
 
 
+@timed("figuras")
 def plot_bar_multi_protocols(qtd_cpf_multi, qtd_cnpj_multi):
     df = pd.DataFrame(
         {
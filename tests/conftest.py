@@ -0,0 +1,46 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synth import generate  # noqa: E402
+from src.parser import parse_files_to_dataframe  # noqa: E402
+
+TITULOS_POR_ARQUIVO = 120
+
+
+@pytest.fixture
+def xml_paths(tmp_path):
+    """
+    Três XMLs sintéticos pequenos de um mesmo lote: cada um com sua faixa
+    de protocolos e números de título, e todos sorteando devedores do mesmo
+    conjunto de documentos. Há devedores com vários protocolos dentro de um
+    arquivo e entre arquivos.
+    """
+    paths = []
+    for seed in range(3):
+        path = tmp_path / f"lote{seed}.xml"
+        generate(
+            str(path),
+            titulos=TITULOS_POR_ARQUIVO,
+            devedores=(1, 3),
+            telefones=(0, 3),
+            docs_distintos=40,
+            seed=seed,
+            primeiro_titulo=seed * TITULOS_POR_ARQUIVO,
+            seed_documentos=0,
+        )
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def xml_frame(xml_paths):
+    """DataFrame do parser (modo árvore) dos arquivos de xml_paths."""
+    df, errors = parse_files_to_dataframe(xml_paths)
+    assert not errors
+    return df
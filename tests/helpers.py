@@ -0,0 +1,18 @@
+# tests/helpers.py
+"""Asserções compartilhadas pelos testes."""
+
+import pandas as pd
+import pytest
+
+
+def assert_same_metrics(result, expected):
+    """result tem os mesmos valores de expected (dicts de compute_all_metrics)."""
+    for key, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            got = result[key].reset_index(drop=True).astype(str)
+            assert list(got.columns) == list(value.columns), key
+            assert got.values.tolist() == value.astype(str).values.tolist(), key
+        elif isinstance(value, float):
+            assert result[key] == pytest.approx(value), key
+        else:
+            assert result[key] == value, key
@@ -0,0 +1,50 @@
+# tests/test_dataset.py
+import pandas as pd
+
+from helpers import assert_same_metrics
+from src.dataset import IncrementalDataset
+from src.metrics import (
+    compute_all_metrics,
+    make_cpf_cnpj_lists,
+    merge_partials,
+    metric_partials,
+    metrics_from_partials,
+)
+from src.parser import parse_files_to_dataframe
+
+
+def test_incremental_dataset_matches_full_parse(xml_paths):
+    ds = IncrementalDataset(streaming=False)
+    ds.add_files(xml_paths)
+    ds.remove_file(xml_paths[1])
+    ds.add_files([xml_paths[1]])
+    order = [xml_paths[0], xml_paths[2], xml_paths[1]]
+    full, _ = parse_files_to_dataframe(order)
+    pd.testing.assert_frame_equal(
+        ds.df.reset_index(drop=True), full, check_categorical=False
+    )
+    assert_same_metrics(ds.metrics(), compute_all_metrics(full.copy()))
+    assert ds.cpf_cnpj_lists() == make_cpf_cnpj_lists(full)
+
+
+def test_incremental_dataset_after_removing_every_file(xml_paths):
+    ds = IncrementalDataset(streaming=False)
+    ds.add_files(xml_paths[:2])
+    for path in xml_paths[:2]:
+        ds.remove_file(path)
+    assert ds.metrics()["total_titulos"] == 0
+    ds.add_files([xml_paths[2]])
+    full, _ = parse_files_to_dataframe([xml_paths[2]])
+    assert_same_metrics(ds.metrics(), compute_all_metrics(full.copy()))
+
+
+def test_merged_partials_match_full_metrics(xml_frame):
+    parts = [
+        metric_partials(group.reset_index(drop=True))
+        for _, group in xml_frame.groupby("source_file", observed=True)
+    ]
+    assert len(parts) == 3
+    assert_same_metrics(
+        metrics_from_partials(merge_partials(parts)),
+        compute_all_metrics(xml_frame.copy()),
+    )
@@ -0,0 +1,82 @@
+# tests/test_metrics.py
+import pandas as pd
+
+from helpers import assert_same_metrics
+from src.metrics import compute_all_metrics, protocols_multi_by_type
+
+
+def row_wise_metrics(df):
+    """Métricas de antes da vetorização, calculadas título a título em Python."""
+    titles = {}
+    for key, tipo, tel in zip(df["title_key"], df["devedor_tipo"], df["telefone"]):
+        flags = titles.setdefault(key, set())
+        if pd.notna(tipo):
+            flags.add(tipo)
+        if pd.notna(tel) and str(tel).strip() != "":
+            flags.add("PHONE")
+    prots, tipos = {}, {}
+    for doc, prot, tipo in zip(
+        df["devedor_documento"], df["protocolo"], df["devedor_tipo"]
+    ):
+        if pd.isna(doc):
+            continue
+        tipos.setdefault(doc, set())
+        if pd.notna(tipo):
+            tipos[doc].add(tipo)
+        prots.setdefault(doc, set())
+        if pd.notna(prot) and str(prot).strip() != "":
+            prots[doc].add(str(prot).strip())
+    multi = {d: sorted(p) for d, p in prots.items() if len(p) > 1}
+
+    def multi_frame(tipo):
+        docs = sorted(d for d in multi if tipo in tipos[d])
+        return pd.DataFrame(
+            {
+                "devedor_documento": docs,
+                "qtd_protocolos_unicos": [len(multi[d]) for d in docs],
+                "protocolos_unicos": [", ".join(multi[d]) for d in docs],
+            }
+        )
+
+    flags = list(titles.values())
+    return {
+        "total_titulos": len(titles),
+        "titles_with_phone": sum("PHONE" in f for f in flags),
+        "titles_with_cpf": sum("CPF" in f for f in flags),
+        "titles_with_cnpj": sum("CNPJ" in f for f in flags),
+        "titles_with_both": sum({"CPF", "CNPJ"} <= f for f in flags),
+        "qtd_cpfs_unicos": sum("CPF" in t for t in tipos.values()),
+        "qtd_cnpjs_unicos": sum("CNPJ" in t for t in tipos.values()),
+        "unique_devedores_total": len(tipos),
+        "df_cpf_multi": multi_frame("CPF"),
+        "df_cnpj_multi": multi_frame("CNPJ"),
+        "cpf_multi_count": len(multi_frame("CPF")),
+        "cnpj_multi_count": len(multi_frame("CNPJ")),
+    }
+
+
+def test_metrics_match_row_wise(xml_frame):
+    expected = row_wise_metrics(xml_frame)
+    assert expected["cpf_multi_count"] and expected["cnpj_multi_count"]
+    assert_same_metrics(compute_all_metrics(xml_frame.copy()), expected)
+
+
+def test_metrics_on_mixed_values():
+    df = pd.DataFrame(
+        {
+            "title_key": ["A", "A", "B", "C", "C", "D"],
+            "protocolo": ["1", " 1 ", "2", None, "3", "  "],
+            "devedor_documento": ["X", "Y", "X", "X", None, "Y"],
+            "devedor_tipo": ["CPF", "CNPJ", "CPF", "CPF", None, "CNPJ"],
+            "telefone": [None, " ", "11", None, "21", ""],
+        }
+    )
+    assert_same_metrics(compute_all_metrics(df.copy()), row_wise_metrics(df))
+
+
+def test_protocols_multi_by_type_matches_metrics(xml_frame):
+    m = compute_all_metrics(xml_frame.copy())
+    for tipo in ("CPF", "CNPJ"):
+        df_multi, count = protocols_multi_by_type(xml_frame, tipo)
+        assert count == m[f"{tipo.lower()}_multi_count"]
+        pd.testing.assert_frame_equal(df_multi, m[f"df_{tipo.lower()}_multi"])
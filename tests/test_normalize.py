@@ -0,0 +1,47 @@
+# tests/test_normalize.py
+import pytest
+
+from src.normalize import normalize_phone_numbers
+
+
+@pytest.mark.parametrize(
+    "raw, phone, mobile",
+    [
+        ("(21) 98888-7777", "5521988887777", True),
+        ("+55 21 98888-7777", "5521988887777", True),
+        ("0 15 21 98888-7777", "5521988887777", True),
+        ("021 98888-7777", "5521988887777", True),
+        ("11 3333-4444", "551133334444", False),
+        ("55 11 3333-4444", "551133334444", False),
+        ("11 8888-7777", "5511988887777", True),
+        ("11 1333-4444", None, False),
+        ("20 98888-7777", None, False),
+        ("11 88888-7777", None, False),
+        ("123", None, False),
+        ("5", None, False),
+        ("0", None, False),
+        ("55", None, False),
+        ("", None, False),
+        ("abc", None, False),
+        (None, None, False),
+    ],
+)
+def test_normalize_phone_numbers(raw, phone, mobile):
+    phones, mobiles = normalize_phone_numbers([raw])
+    assert phones.tolist() == [phone]
+    assert mobiles.tolist() == [mobile]
+
+
+def test_normalize_phone_numbers_single_digit_batch():
+    phones, mobiles = normalize_phone_numbers(["5"])
+    assert phones.tolist() == [None]
+    assert mobiles.tolist() == [False]
+    phones, _ = normalize_phone_numbers(["0", "(21) 98888-7777", "5"])
+    assert phones.tolist() == [None, "5521988887777", None]
+
+
+def test_normalize_phone_numbers_repeated_values():
+    raw = ["(21) 98888-7777", "21988887777", "(21) 98888-7777", None]
+    phones, mobiles = normalize_phone_numbers(raw)
+    assert phones.tolist() == ["5521988887777"] * 3 + [None]
+    assert mobiles.tolist() == [True, True, True, False]
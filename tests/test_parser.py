@@ -0,0 +1,167 @@
+# tests/test_parser.py
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from lxml import etree
+
+from helpers import assert_same_metrics
+from src.dataset import IncrementalDataset
+from src.metrics import compute_all_metrics
+from src.parser import (
+    compute_title_key,
+    iter_records_streaming,
+    parse_files_to_dataframe,
+    parse_single_tree,
+    phone_lists,
+    phones_frame,
+)
+from src.store import RecordStore
+
+NESTED_XML = b"""<carta_cancelamento><titulos>
+<titulo><protocolo>1</protocolo><numerotitulo>A</numerotitulo>
+  <devedor><documento>11144477735</documento></devedor>
+  <titulo><protocolo>2</protocolo><numerotitulo>B</numerotitulo>
+    <titulo><protocolo>3</protocolo><numerotitulo>C</numerotitulo></titulo>
+  </titulo>
+  <titulo><protocolo>4</protocolo><numerotitulo>D</numerotitulo></titulo>
+</titulo>
+<titulo><protocolo>5</protocolo><numerotitulo>E</numerotitulo></titulo>
+</titulos></carta_cancelamento>"""
+
+PHONES_XML = b"""<carta_cancelamento><titulos>
+<titulo><protocolo>1</protocolo><numerotitulo>A</numerotitulo>
+  <devedores><devedor><documento>11144477735</documento>
+    <telefones><telefone>0</telefone></telefones>
+  </devedor></devedores>
+</titulo>
+</titulos></carta_cancelamento>"""
+
+
+def row_wise_title_key(row):
+    """title_key linha a linha, como era antes de compute_title_key."""
+    if pd.notna(row.get("numerotitulo")) and str(row.get("numerotitulo")).strip() != "":
+        return str(row.get("numerotitulo"))
+    if pd.notna(row.get("protocolo")) and str(row.get("protocolo")).strip() != "":
+        return "P:" + str(row.get("protocolo"))
+    return f"ROWIDX:{row.name}"
+
+
+def test_compute_title_key_matches_row_wise():
+    df = pd.DataFrame(
+        {
+            "numerotitulo": ["T1", None, np.nan, "  ", 123, "", None, 4.5, "T1"],
+            "protocolo": ["P1", "P2", None, "P4", None, "  ", np.nan, "P8", 77],
+        },
+        index=[5, 3, 9, 0, 12, 7, 1, 8, 2],
+    )
+    expected = df.apply(row_wise_title_key, axis=1)
+    result = compute_title_key(df)
+    assert result.index.equals(df.index)
+    assert result.tolist() == expected.tolist()
+
+
+def test_compute_title_key_without_columns():
+    df = pd.DataFrame({"protocolo": [None, "P"]}, index=[4, 2])
+    assert compute_title_key(df).tolist() == ["ROWIDX:4", "P:P"]
+
+
+def test_streaming_keeps_document_order_for_nested_titulos():
+    tree = parse_single_tree(etree.parse(io.BytesIO(NESTED_XML)))
+    streamed = list(iter_records_streaming(io.BytesIO(NESTED_XML)))
+    assert streamed == tree
+    assert [r["numerotitulo"] for r in streamed] == ["A", "B", "C", "D", "E"]
+
+    frames = []
+    for streaming in (False, True):
+        f = io.BytesIO(NESTED_XML)
+        f.name = "aninhado.xml"
+        df, errors = parse_files_to_dataframe([f], streaming=streaming)
+        assert not errors
+        frames.append(df)
+    pd.testing.assert_frame_equal(frames[0], frames[1])
+
+
+def test_concat_with_all_null_categorical_column(xml_paths):
+    with open(xml_paths[0], "rb") as f:
+        data = f.read()
+    sem_credor = io.BytesIO(data.replace(b"credor>", b"outro>"))
+    sem_credor.name = "sem_credor.xml"
+    ds = IncrementalDataset(streaming=False)
+    ds.add_files([xml_paths[1], sem_credor])
+    df = ds.df
+    n = len(df) - df["source_file"].eq("sem_credor.xml").sum()
+    assert df["credor"].dtype == "category"
+    assert df["credor"].cat.categories.dtype == object
+    assert df["credor"].notna().sum() == n
+    assert_same_metrics(ds.metrics(), compute_all_metrics(df.copy()))
+
+
+def test_phone_lists_dedupes_per_record():
+    joined = phone_lists(
+        [
+            ["(21) 98888-7777", "21 98888-7777", "11 3333-4444"],
+            ["5", "abc"],
+            [],
+            ["11 3333-4444", "(21) 98888-7777"],
+        ]
+    )
+    assert list(joined) == [
+        "5521988887777;551133334444",
+        pd.NA,
+        pd.NA,
+        "551133334444;5521988887777",
+    ]
+    phones = phones_frame(pd.DataFrame({"telefones": joined}))
+    assert phones["registro"].tolist() == [0, 0, 3, 3]
+    assert phones["ddd"].tolist() == ["21", "11", "11", "21"]
+    assert phones["celular"].tolist() == [True, False, False, True]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_single_digit_phone_does_not_break_parse(streaming):
+    f = io.BytesIO(PHONES_XML)
+    f.name = "um_digito.xml"
+    df, errors = parse_files_to_dataframe([f], streaming=streaming)
+    assert not errors
+    assert len(df) == 1
+    assert df["telefones"].isna().all()
+    m = compute_all_metrics(df.copy())
+    assert m["unique_phones"] == 0
+    assert m["titles_with_valid_mobile"] == 0
+
+    ds = IncrementalDataset(streaming=streaming)
+    f.seek(0)
+    assert ds.add_files([f]) == []
+    assert len(ds.df) == 1
+    with RecordStore() as store:
+        f.seek(0)
+        assert store.add_files([f]) == []
+        assert store.metrics()["unique_phones"] == 0
+
+
+def test_fixture_shares_documents_across_files(xml_frame):
+    df = xml_frame
+    assert df["title_key"].nunique() == 3 * 120
+    docs = df.dropna(subset=["devedor_documento"])
+    files_per_doc = docs.groupby("devedor_documento")["source_file"].nunique()
+    assert (files_per_doc > 1).any()
+
+
+def test_process_pool_from_a_thread_matches_serial(xml_paths):
+    # como no app: o pool é criado dentro da thread do ParseJob
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(
+            df=parse_files_to_dataframe(xml_paths, streaming=True, workers=2)
+        )
+    )
+    thread.start()
+    thread.join(120)
+    assert not thread.is_alive()
+    df, errors = result["df"]
+    serial, _ = parse_files_to_dataframe(xml_paths, streaming=True)
+    assert not errors
+    pd.testing.assert_frame_equal(df, serial)
@@ -0,0 +1,47 @@
+# tests/test_store.py
+import io
+import re
+
+import pandas as pd
+
+from helpers import assert_same_metrics
+from src.metrics import compute_all_metrics, make_cpf_cnpj_lists
+from src.parser import parse_files_to_dataframe
+from src.store import RecordStore
+
+
+def test_store_matches_pandas(xml_paths, xml_frame):
+    with RecordStore() as store:
+        store.add_files(xml_paths)
+        assert_same_metrics(store.metrics(), compute_all_metrics(xml_frame.copy()))
+        assert store.cpf_cnpj_lists() == make_cpf_cnpj_lists(xml_frame)
+        frames = pd.concat(store.iter_frames(), ignore_index=True)
+    assert frames["title_key"].tolist() == xml_frame["title_key"].tolist()
+
+
+def test_store_replaces_and_removes_files(xml_paths):
+    with RecordStore(batch_files=1) as store:
+        store.add_files(xml_paths)
+        store.add_files([xml_paths[0]])
+        store.remove_file(xml_paths[1])
+        assert store.names == [xml_paths[2], xml_paths[0]]
+        df, _ = parse_files_to_dataframe([xml_paths[2], xml_paths[0]])
+        assert_same_metrics(store.metrics(), compute_all_metrics(df.copy()))
+
+
+def test_store_accepts_titulos_without_value(xml_paths):
+    with open(xml_paths[0], "rb") as f:
+        data = f.read()
+    # dois títulos sem valorprotestado e um com valor que não converte
+    data = re.sub(rb"<valorprotestado>[^<]*</valorprotestado>", b"", data, count=2)
+    data = data.replace(b"<valorprotestado>", b"<valorprotestado>abc", 1)
+    sem_valor = io.BytesIO(data)
+    sem_valor.name = "sem_valor.xml"
+    df, _ = parse_files_to_dataframe([sem_valor])
+    assert df["valor_centavos"].isna().any()
+    with RecordStore() as store:
+        sem_valor.seek(0)
+        assert store.add_files([sem_valor]) == []
+        result = store.metrics()
+    assert result["titles_with_valor"] < result["total_titulos"]
+    assert_same_metrics(result, compute_all_metrics(df.copy()))